@@ -3,11 +3,13 @@
 """Contains all writers for standard chemical representations."""
 
 
+from pychamp.io.datreader import DAT as DATReader
 from pychamp.io.xyzreader import XYZ as XYZReader
 from pychamp.io.xyzwriter import XYZ as XYZWriter
 
 from pychamp.io.ccio import ccopen
 from pychamp.io.ccio import qcread
+from pychamp.io.ccio import qcread_many
 from pychamp.io.ccio import qcwrite
 from pychamp.io.ccio import write_champ_old_sym
 from pychamp.io.ccio import write_champ_old_geo
@@ -15,3 +17,6 @@ from pychamp.io.ccio import write_champ_old_lcao
 from pychamp.io.ccio import write_champ_old_det
 
 from pychamp.io.ccio import URL_PATTERN
+
+from pychamp.io.cache import ParseCache
+from pychamp.io.hdf5io import CampaignArchive
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+"""On-disk cache of parsed logfiles, keyed by their contents."""
+
+import hashlib
+import inspect
+import os
+import sys
+import tempfile
+import zipfile
+
+from pychamp.io import npzio
+from pychamp.parser import data as ccdata_module
+
+
+# Changing this invalidates all existing cache entries.
+CACHE_FORMAT = 3
+
+# Keyword arguments of qcread that do not change the parsed data.
+_ignored_options = ("cache", "verbose", "quiet", "lazy", "loglevel", "logname", "logstream",
+                    "follow", "interval", "timeout", "workers", "threaded")
+
+# Keyword arguments of qcread that are collections of attribute names.
+_name_options = ("only", "exclude")
+
+# Hashes of the source code of parser classes, see parser_version.
+_parser_versions = {}
+
+
+def default_cache_directory():
+    """Return the directory used by ParseCache when none is given.
+
+    This is $PYCHAMP_CACHE if it is set, or pychamp in the user cache directory.
+    """
+
+    directory = os.environ.get("PYCHAMP_CACHE")
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(base, "pychamp")
+    return directory
+
+
+def parser_version(parsertype):
+    """Return a hash of the source code that a parser class uses to build its results.
+
+    This covers the modules of the class and its pychamp base classes, and that
+    of ccData, so that entries written by another version of a parser are not
+    used, while changes to the rest of pychamp keep the entries valid.
+    """
+
+    version = _parser_versions.get(parsertype)
+    if version is None:
+        modules = {cls.__module__ for cls in inspect.getmro(parsertype)
+                   if cls.__module__.startswith("pychamp.")}
+        modules.add(ccdata_module.__name__)
+        digest = hashlib.sha256()
+        for module in sorted(modules):
+            digest.update(module.encode())
+            source = inspect.getsourcefile(sys.modules[module])
+            if source:
+                with open(source, "rb") as handle:
+                    digest.update(handle.read())
+        version = _parser_versions[parsertype] = digest.hexdigest()
+    return version
+
+
+class ParseCache:
+    """Cache of parsed data objects in a directory, with one file per entry.
+
+    Entries are keyed by a hash of the contents of the logfile, the parser
+    (see parser_version) and the options that change what is parsed, so an
+    entry is never used for a logfile that has changed since it was stored.
+    Each entry is an .npz archive written by npzio, whose arrays are memory-
+    mapped when it is read. When the entries take more than maxsize bytes,
+    the least recently used ones are removed.
+    """
+
+    # Extension of the files holding cache entries.
+    extension = ".npz"
+
+    def __init__(self, directory=None, maxsize=2**30):
+        """Initialize the cache.
+
+        Inputs:
+            directory - where to store the entries, by default default_cache_directory()
+            maxsize - maximum total size of the entries in bytes
+        """
+
+        self.directory = directory or default_cache_directory()
+        self.maxsize = maxsize
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, filename, options=None, parsertype=None):
+        """Return the cache key for parsing a logfile with the given qcread options.
+
+        The parsertype is the class that reads the logfile, if it is known.
+        """
+
+        digest = hashlib.sha256()
+        with open(filename, "rb") as handle:
+            for block in iter(lambda: handle.read(2**20), b""):
+                digest.update(block)
+
+        relevant = []
+        for name, value in (options or {}).items():
+            if name in _ignored_options:
+                continue
+            if name in _name_options and value is not None:
+                value = sorted(set(value))
+            relevant.append((name, repr(value)))
+        relevant.sort()
+
+        parser = None
+        if parsertype is not None:
+            parser = (parsertype.__module__, parsertype.__qualname__, parser_version(parsertype))
+        digest.update(repr((CACHE_FORMAT, parser, relevant)).encode())
+
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def get(self, key):
+        """Return the data object stored for key, or None if there is none."""
+
+        path = self._path(key)
+        try:
+            data = npzio.load(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+        # The modification time records the last use, for the eviction order.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return data
+
+    def put(self, key, data):
+        """Store a data object for key, evicting old entries if needed.
+
+        All deferred attributes are loaded first, so that the stored object
+        does not refer back to the logfile.
+        """
+
+        # Write to a temporary file first, so that no reader sees a partial entry.
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            npzio.save(data, temporary)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until they fit in maxsize."""
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.extension):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.maxsize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all entries."""
+
+        maxsize, self.maxsize = self.maxsize, -1
+        try:
+            self.evict()
+        finally:
+            self.maxsize = maxsize
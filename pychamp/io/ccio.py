@@ -3,6 +3,8 @@
 """Tools for identifying, reading and writing files."""
 
 import atexit
+import collections
+import concurrent.futures
 import io
 import os
 import sys
@@ -18,7 +20,9 @@ from pychamp.parser.utils import find_package
 
 from pychamp.parser.gamessparser import GAMESS
 
+from pychamp.io import datreader
 from pychamp.io import xyzreader
+from pychamp.io.cache import ParseCache
 from pychamp.io import xyzwriter
 
 #  Core is needed to compute the core number of electrons
@@ -60,7 +64,20 @@ URL_PATTERN = re.compile(
 #   (parser, phrases, flag whether we should break)
 triggers = [ (GAMESS, ["GAMESS"], False)  ]
 
+# Number of characters at the start of a file searched for triggers by guess_filetype.
+sniff_size = 2**18
+
+# The triggers with lowercase phrases, and whether only one parser has triggers.
+_lowered_triggers = [(parser, [p.lower() for p in phrases], do_break)
+                     for parser, phrases, do_break in triggers]
+_only_parser = len({parser for parser, phrases, do_break in triggers}) == 1
+
+# Filetypes guessed by ccopen, keyed by (path, mtime, size) of the logfile.
+_filetype_cache = {}
+_filetype_cache_size = 1024
+
 readerclasses = {
+    'dat': datreader.DAT,
     'xyz': xyzreader.XYZ,
 }
 
@@ -69,34 +86,61 @@ writerclasses = {
 }
 
 
+# Results of qcread_many for each source.
+ReadResult = collections.namedtuple('ReadResult', ['source', 'data', 'error'])
+
+
 class UnknownOutputFormatError(Exception):
     """Raised when an unknown output format is encountered."""
 
 
-def guess_filetype(inputfile):
-    """Try to guess the filetype by searching for trigger strings."""
+def guess_filetype(inputfile, limit=None):
+    """Try to guess the filetype by searching for trigger strings.
+
+    Only the first limit characters (by default sniff_size) of the input are
+    searched, and the search stops at the first trigger that decides the
+    filetype, which is one that breaks or the only parser with triggers.
+    """
     if not inputfile:
         return None
 
-    filetype = None
+    if limit is None:
+        limit = sniff_size
     if isinstance(inputfile, str):
-        for line in inputfile:
-            for parser, phrases, do_break in triggers:
-                if all([line.lower().find(p.lower()) >= 0 for p in phrases]):
-                    filetype = parser
-                    if do_break:
-                        return filetype
-    else:
-        for fname in inputfile:
-            for line in inputfile:
-                for parser, phrases, do_break in triggers:
-                    if all([line.lower().find(p.lower()) >= 0 for p in phrases]):
-                        filetype = parser
-                        if do_break:
-                            return filetype
+        inputfile = inputfile.splitlines(True)
+
+    filetype = None
+    size = 0
+    for line in inputfile:
+        line = line.lower()
+        for parser, phrases, do_break in _lowered_triggers:
+            if all([line.find(p) >= 0 for p in phrases]):
+                filetype = parser
+                if do_break or _only_parser:
+                    return filetype
+        size += len(line)
+        if size >= limit:
+            break
     return filetype
 
 
+def _cached_filetype(filename):
+    """Return the filetype guessed before for a file, if it has not changed since."""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None, None
+    key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+    return _filetype_cache.get(key), key
+
+
+def _cache_filetype(key, filetype):
+    """Remember the filetype guessed for a file, forgetting the oldest beyond the limit."""
+    if len(_filetype_cache) >= _filetype_cache_size:
+        del _filetype_cache[next(iter(_filetype_cache))]
+    _filetype_cache[key] = filetype
+
+
 def qcread(source, *args, **kwargs):
     """Attempt to open and read computational chemistry data from a file.
 
@@ -107,11 +151,35 @@ def qcread(source, *args, **kwargs):
     Inputs:
         source - a single logfile, a list of logfiles (for a single job),
                  an input stream, or an URL pointing to a log file.
-        *args, **kwargs - arguments and keyword arguments passed to ccopen
+        *args, **kwargs - arguments and keyword arguments passed to ccopen;
+                          with cache=True (or a directory, or a ParseCache),
+                          data read from a logfile on disk is stored in and
+                          taken from an on-disk cache keyed by its contents
     Returns:
-        a ccData object containing cclib data attributes
+        a ccData object containing cclib data attributes, or with follow=True
+        a generator of ccData objects for a job that is still running, updated
+        every interval seconds until timeout (see Logfile.follow), or with
+        split_jobs=True a list of ccData objects, one for each job in the
+        logfile, parsed by the given number of workers (see Logfile.parse_jobs)
     """
 
+    # The cache holds single data objects, so it is not used for the generators
+    # of follow=True or the lists of split_jobs=True.
+    cache = kwargs.get("cache", None)
+    if cache and not kwargs.get("follow", False) and not kwargs.get("split_jobs", False) \
+            and isinstance(source, str) and not URL_PATTERN.match(source) and os.path.isfile(source):
+        if not isinstance(cache, ParseCache):
+            cache = ParseCache(None if cache is True else cache)
+        options = {name: value for name, value in kwargs.items() if name != "cache"}
+        log = ccopen(source, *args, **options)
+        key = cache.key(source, kwargs, type(log) if log else None)
+        data = cache.get(key)
+        if data is None:
+            data = qcread(source, *args, **options)
+            if data is not None:
+                cache.put(key, data)
+        return data
+
     log = ccopen(source, *args, **kwargs)
     if log:
         if kwargs.get('verbose', None):
@@ -120,6 +188,10 @@ def qcread(source, *args, **kwargs):
         cjson_as_input = kwargs.get("cjson", False)
         if cjson_as_input:
             return log.read_cjson()
+        elif kwargs.get("follow", False):
+            return log.follow(interval=kwargs.get("interval", 60.0), timeout=kwargs.get("timeout"))
+        elif kwargs.get("split_jobs", False):
+            return log.parse_jobs(workers=kwargs.get("workers"))
         else:
             return log.parse()
     else:
@@ -128,13 +200,90 @@ def qcread(source, *args, **kwargs):
         return fallback(source)
 
 
+def qcread_many(sources, workers=None, ordered=True, pending=None, **kwargs):
+    """Read many logfiles with qcread in a pool of worker processes.
+
+    The logfiles are read as they are needed by the caller, and at most pending
+    of them are being read or waiting to be delivered at any time, so that
+    memory use does not grow with the number of sources. An error while reading
+    one logfile does not stop the others from being read.
+
+    Inputs:
+        sources - an iterable of sources as accepted by qcread
+        workers - number of worker processes, by default the number of CPUs
+        ordered - if True, results are delivered in the order of sources,
+                  otherwise as soon as each logfile has been read
+        pending - maximum number of logfiles submitted but not yet delivered,
+                  by default twice the number of workers
+        **kwargs - keyword arguments passed to qcread
+    Returns:
+        a generator of ReadResult tuples (source, data, error), where data is
+        the ccData object read from source, or None if it could not be read,
+        and error is the exception raised while reading it, if any
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if pending is None:
+        pending = 2 * workers
+    if pending < 1:
+        raise ValueError("pending must be at least 1")
+
+    sources = iter(sources)
+    submitted = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(submitted) < pending:
+                source = next(sources, _no_source)
+                if source is _no_source:
+                    break
+                submitted.append((source, executor.submit(_qcread_job, source, kwargs)))
+            if not submitted:
+                return
+
+            if ordered:
+                source, future = submitted.popleft()
+            else:
+                done, not_done = concurrent.futures.wait(
+                    [future for source, future in submitted],
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for index, (source, future) in enumerate(submitted):
+                    if future in done:
+                        del submitted[index]
+                        break
+
+            try:
+                data, error = future.result()
+            except Exception as exception:
+                # For example, the worker process died or the error could not be pickled.
+                data, error = None, exception
+            yield ReadResult(source, data, error)
+
+
+# Marks the end of the sources in qcread_many.
+_no_source = object()
+
+
+def _qcread_job(source, kwargs):
+    """Read one source in a worker process of qcread_many."""
+    try:
+        return qcread(source, **kwargs), None
+    except Exception as error:
+        return None, error
+
+
 def ccopen(source, *args, **kwargs):
     """Guess the identity of a particular log file and return an instance of it.
 
     Inputs:
         source - a single logfile, a list of logfiles (for a single job),
                  an input stream, or an URL pointing to a log file.
-        *args, **kwargs - arguments and keyword arguments passed to filetype
+        *args, **kwargs - arguments and keyword arguments passed to filetype,
+                          for example lazy=True to decode bulky sections only
+                          when their attributes are first accessed, only=[...]
+                          and exclude=[...] to parse only some attributes, or
+                          threaded=True to decompress compressed logfiles in a
+                          background thread
 
     Returns:
         GAMESS object
@@ -148,6 +297,21 @@ def ccopen(source, *args, **kwargs):
     is_string = isinstance(source, str)
     is_url = True if is_string and URL_PATTERN.match(source) else False
     is_listofstrings = isinstance(source, list) and all([isinstance(s, str) for s in source])
+
+    # Files with the extension of one of the readers are read by it, even when
+    # their contents could pass for a logfile, as GAMESS punch files can.
+    if is_string and not is_url:
+        reader = readerclasses.get(os.path.splitext(source)[1][1:].lower())
+        if reader:
+            return reader(source, *args, **kwargs)
+
+    # A file that has not changed since its filetype was guessed need not be opened here.
+    cache_key = None
+    if is_string and not is_url:
+        filetype, cache_key = _cached_filetype(source)
+        if filetype:
+            return filetype(source, *args, **kwargs)
+
     if is_string or is_listofstrings:
         # Process links from list (download contents into temporary location)
         if is_listofstrings:
@@ -219,10 +383,8 @@ def ccopen(source, *args, **kwargs):
     # could be guessed. Need to make sure the input file is closed before creating
     # an instance, because parsers will handle opening/closing on their own.
     filetype = guess_filetype(inputfile)
-
-    # If the input file isn't a standard compchem log file, try one of
-    # the readers, falling back to Open Babel.
-
+    if filetype and cache_key:
+        _cache_filetype(cache_key, filetype)
 
     if filetype:
         # We're going to close and reopen below anyway, so this is just to avoid
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+"""A reader for GAMESS punch (.dat) files."""
+
+import numpy
+
+from pychamp.io import filereader
+from pychamp.parser import utils
+from pychamp.parser.data import ccData
+
+
+class DAT(filereader.Reader):
+    """A reader for the orbitals in GAMESS punch (.dat) files."""
+
+    # Width of the coefficient fields in $VEC lines, and their number per line.
+    field_width = 15
+    fields_per_line = 5
+
+    def parse(self):
+        super(DAT, self).parse()
+
+        self.generate_repr()
+
+        return self.data
+
+    def generate_repr(self):
+        """Convert the raw contents of the source into the internal representation."""
+
+        assert hasattr(self, 'filecontents')
+
+        # The orbitals are punched as $VEC groups, each preceded by a title:
+        #
+        # --- CLOSED SHELL ORBITALS --- GENERATED AT 10:12:41 LT  6-JUN-2019
+        # E(RHF)=      -75.0101, E(NUC)=    9.1681, 11 ITERS
+        #  $VEC
+        #  1  1 9.94119806E-01 2.65817539E-02 3.08480447E-03 ...
+        #  1  2 ...
+        #  $END
+        #
+        # Every orbital takes the same number of lines, with five coefficients in
+        # E15.8 format after the orbital number (modulo 100) and the line number.
+        # Natural orbitals have "NATURAL ORBITALS" in their title, and may be
+        # followed by their occupation numbers in an $OCC group. Only the last
+        # group of each kind is kept.
+        title = ""
+        vectors = None
+        naturals = None
+        occupations = None
+
+        it = iter(self.filecontents.splitlines())
+        for line in it:
+
+            if line.startswith("---"):
+                title = line
+
+            group = line.strip().upper()
+            if group not in ("$VEC", "$OCC"):
+                continue
+
+            lines = []
+            line = next(it, " $END")
+            while line.strip().upper() != "$END":
+                lines.append(line)
+                line = next(it, " $END")
+
+            if group == "$OCC":
+                occupations = numpy.array(" ".join(lines).split(), "d")
+            elif "NATURAL ORBITALS" in title.upper():
+                naturals = self._decode_vec(lines)
+            else:
+                vectors = self._decode_vec(lines)
+
+        attributes = {}
+        if vectors is not None:
+            attributes['mocoeffs'] = vectors
+            attributes['nbasis'] = vectors[0].shape[1]
+            attributes['nmo'] = vectors[0].shape[0]
+        if naturals is not None:
+            attributes['nocoeffs'] = naturals[0]
+            attributes['nbasis'] = naturals[0].shape[1]
+        if occupations is not None:
+            attributes['nooccnos'] = occupations
+
+        self.data = ccData(attributes)
+
+    def _decode_vec(self, lines):
+        """Decode the lines of a $VEC group to a list of coefficient arrays.
+
+        All coefficients are decoded by one call to utils.fixed_width_floats.
+        The list has one array for restricted orbitals, and two (alpha and beta)
+        for unrestricted ones. The beta orbitals start where the orbital number
+        goes back to 1 before it should (it is printed modulo 100), or else
+        halfway when there are more orbitals than basis functions.
+        """
+
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return [numpy.zeros((0, 0), "d")]
+
+        # The line number restarts at 1 with each orbital.
+        numbers = [int(line[2:5]) for line in lines]
+        nlines = numbers.index(1, 1) if numbers.count(1) > 1 else len(numbers)
+        if len(lines) % nlines != 0:
+            raise ValueError("$VEC group with an incomplete orbital")
+
+        width, ncols = self.field_width, self.fields_per_line
+        nbasis = ncols * (nlines - 1) + (len(lines[nlines - 1].rstrip()) - 5 + width - 1) // width
+
+        coeffs = utils.fixed_width_floats(lines, width, ncols, start=5)
+        coeffs = coeffs.reshape(len(lines) // nlines, nlines * ncols)[:, :nbasis]
+
+        orbitals = [int(line[:2]) for line in lines[::nlines]]
+        for i, number in enumerate(orbitals):
+            if number == 1 and (i + 1) % 100 != 1:
+                return [coeffs[:i], coeffs[i:]]
+        if len(coeffs) > nbasis:
+            return [coeffs[:len(coeffs) // 2], coeffs[len(coeffs) // 2:]]
+        return [coeffs]
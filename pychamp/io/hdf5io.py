@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+"""An archive of many data objects in one HDF5 file."""
+
+import numpy
+
+from pychamp import __version__
+from pychamp.io.npzio import from_json
+from pychamp.io.npzio import stored_attributes
+from pychamp.io.npzio import to_json
+from pychamp.parser import data as ccdata_module
+from pychamp.parser.utils import find_package
+
+
+# The h5py package is optional, and needed only for campaign archives.
+_found_h5py = find_package("h5py")
+if _found_h5py:
+    import h5py
+
+
+class CampaignArchive:
+    """Many data objects, such as all the results of a campaign, in one HDF5 file.
+
+    Each data object is stored in a group under /calculations, with a dataset
+    for each array and a subgroup for each list or dictionary of arrays. Arrays
+    of at least chunk_size elements are chunked and compressed. The remaining
+    attributes are written as JSON into one more dataset of the group, and the class
+    of the data object is recorded as well, so that any calculation can be
+    read back on its own.
+
+    The scalar attributes (integers, floats and Booleans, like natom or charge)
+    of all calculations are also collected in one column per attribute under
+    /columns, with a row per calculation in the order they were added, NaN for
+    calculations without the attribute, and the names of the calculations in
+    /columns/name. A whole campaign can then be queried without opening every
+    calculation.
+    """
+
+    # Arrays with at least this many elements are stored chunked and compressed.
+    chunk_size = 4096
+
+    # Number of rows by which the columns are grown at once.
+    column_chunk = 1024
+
+    # Name of the dataset holding the attributes that are not arrays, as JSON.
+    _values_name = "__values__"
+
+    def __init__(self, path, mode="r", compression="gzip", compression_opts=4):
+        """Open the archive.
+
+        Inputs:
+            path - name of the HDF5 file
+            mode - "r" to read, "a" to read and add to the archive, "w" to start a new one
+            compression - HDF5 filter used for large arrays, or None
+            compression_opts - options of the filter, the level for gzip
+        """
+
+        assert _found_h5py, "ERROR: module h5py is needed for campaign archives"
+
+        self.path = path
+        self.compression = compression
+        self.compression_opts = compression_opts if compression == "gzip" else None
+
+        self.file = h5py.File(path, mode)
+        if mode != "r":
+            self.file.attrs.setdefault("version", __version__)
+            self.file.require_group("calculations")
+            self.file.require_group("columns")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    @property
+    def names(self):
+        """The names of the calculations, in the order they were added."""
+        if "columns/name" not in self.file:
+            return []
+        return [name.decode() for name in self.file["columns/name"][()]]
+
+    def __len__(self):
+        if "columns/name" not in self.file:
+            return 0
+        return len(self.file["columns/name"])
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return "calculations/%s" % name in self.file
+
+    def add(self, ccdata, name=None):
+        """Store a data object as a new calculation, and return its name.
+
+        Inputs:
+            ccdata - the data object, whose deferred attributes are loaded first
+            name - name of the calculation, by default its row number in the columns
+        """
+
+        row = len(self)
+        if name is None:
+            name = "%08i" % row
+        name = str(name)
+        if "/" in name:
+            raise ValueError("calculation names cannot contain '/': %s" % name)
+        if name in self:
+            raise ValueError("there already is a calculation named %s" % name)
+
+        attributes = stored_attributes(ccdata)
+
+        group = self.file["calculations"].create_group(name)
+        schema = ccdata._arrayschema()
+        values = {}
+        for attr, value in attributes.items():
+            kind = schema[attr][0] if attr in schema else None
+            if kind is numpy.ndarray:
+                self._write_array(group, attr, value)
+            elif kind is list:
+                subgroup = group.create_group(attr)
+                subgroup.attrs["kind"] = "list"
+                for i, array in enumerate(value):
+                    self._write_array(subgroup, str(i), array)
+            elif kind is dict:
+                subgroup = group.create_group(attr)
+                subgroup.attrs["kind"] = "dict"
+                subgroup.attrs["keys"] = to_json(list(value))
+                for i, key in enumerate(value):
+                    self._write_array(subgroup, str(i), value[key])
+            else:
+                values[attr] = value
+        group.attrs["datatype"] = type(ccdata).__name__
+        # HDF5 attributes are limited in size, so this goes into a dataset.
+        group.create_dataset(self._values_name, data=to_json(values), dtype=h5py.string_dtype())
+
+        self._append_row(row, name, attributes)
+
+        return name
+
+    def _write_array(self, group, name, array):
+        array = numpy.asarray(array)
+        if array.size >= self.chunk_size:
+            group.create_dataset(name, data=array, chunks=True, shuffle=True,
+                                 compression=self.compression,
+                                 compression_opts=self.compression_opts)
+        else:
+            group.create_dataset(name, data=array)
+
+    def _append_row(self, row, name, attributes):
+        """Add a row with the scalar attributes of a calculation to the columns."""
+
+        columns = self.file["columns"]
+        scalars = {attr: value for attr, value in attributes.items()
+                   if isinstance(value, (int, float, bool, numpy.number, numpy.bool_))}
+        scalars["name"] = name.encode()
+
+        for attr in set(columns).union(scalars):
+            if attr not in columns:
+                if attr == "name":
+                    dtype, fill = h5py.string_dtype(), b""
+                else:
+                    dtype, fill = "d", numpy.nan
+                columns.create_dataset(attr, shape=(row,), maxshape=(None,), dtype=dtype,
+                                       chunks=(self.column_chunk,), fillvalue=fill)
+            column = columns[attr]
+            column.resize((row + 1,))
+            if attr in scalars:
+                column[row] = scalars[attr]
+
+    def __getitem__(self, name):
+        """Read a calculation back as a data object."""
+
+        if name not in self:
+            raise KeyError(name)
+        group = self.file["calculations/%s" % name]
+
+        attributes = from_json(group[self._values_name][()])
+        for attr, item in group.items():
+            if attr == self._values_name:
+                continue
+            if isinstance(item, h5py.Dataset):
+                attributes[attr] = item[()]
+            elif item.attrs["kind"] == "list":
+                attributes[attr] = [item[str(i)][()] for i in range(len(item))]
+            else:
+                keys = from_json(item.attrs["keys"])
+                attributes[attr] = {key: item[str(i)][()] for i, key in enumerate(keys)}
+
+        datatype = getattr(ccdata_module, group.attrs["datatype"], ccdata_module.ccData)
+        ccdata = datatype()
+        # The attributes already have their final types, so the conversions done by
+        # the setattributes() of subclasses, like that of optdone, are not repeated.
+        ccdata_module.ccData.setattributes(ccdata, attributes)
+        return ccdata
+
+    def column(self, attr):
+        """Return the values of a scalar attribute for all calculations, as an array."""
+        if attr not in self.file["columns"]:
+            raise KeyError(attr)
+        return self.file["columns"][attr][()]
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+"""Saving data objects to uncompressed NumPy archives, and loading them back."""
+
+import json
+import struct
+import zipfile
+
+import numpy
+
+from pychamp import __version__
+from pychamp.parser import data as ccdata_module
+
+
+# Changing this makes existing files unreadable, so only do it when the layout changes.
+NPZ_FORMAT = 2
+
+# Name of the archive member holding the header.
+_header_name = "__header__"
+
+
+def save(ccdata, path):
+    """Save the attributes of a data object to an uncompressed .npz archive.
+
+    Every array, and every array in a list or dictionary of arrays, is stored
+    as a separate .npy member of the archive, so that load() can memory-map it.
+    The other attributes, together with the class of the data object and the
+    layout of the arrays, are written as JSON into a small header member.
+
+    Inputs:
+        ccdata - the data object to save, whose deferred attributes are loaded first
+        path - name of the file to write
+    """
+
+    attributes = stored_attributes(ccdata)
+
+    schema = ccdata._arrayschema()
+    arrays = {}
+    layout = {}
+    values = {}
+    for name, value in attributes.items():
+        kind = schema[name][0] if name in schema else None
+        if kind is numpy.ndarray:
+            arrays[name] = value
+            layout[name] = ("array", None)
+        elif kind is list:
+            keys = list(range(len(value)))
+            arrays.update(("%s.%i" % (name, i), array) for i, array in zip(keys, value))
+            layout[name] = ("list", keys)
+        elif kind is dict:
+            keys = list(value)
+            arrays.update(("%s.%i" % (name, i), value[key]) for i, key in enumerate(keys))
+            layout[name] = ("dict", keys)
+        else:
+            values[name] = value
+
+    header = {
+        "format": NPZ_FORMAT,
+        "version": __version__,
+        "datatype": type(ccdata).__name__,
+        "layout": layout,
+        "values": values,
+    }
+    header = numpy.frombuffer(to_json(header).encode("utf-8"), "u1")
+
+    # The file name is passed as an open file, since numpy.savez would append .npz to it.
+    with open(path, "wb") as handle:
+        numpy.savez(handle, **{_header_name: header}, **arrays)
+
+
+def stored_attributes(ccdata):
+    """Return the attributes of a data object that need to be stored.
+
+    Deferred attributes are loaded, except those that the data object expands
+    from packed ones (see ccData._packed), like aooverlaps and gbasis. These
+    are left out whenever their packed forms are there, since they are built
+    again from them when used.
+    """
+
+    deferred = ccdata._deferred or {}
+    names = ccdata._present.union(name for name, loader in deferred.items() if loader is not None)
+    names.difference_update(name for name, (sources, expand) in ccdata._packed.items()
+                            if sources[0] in names)
+    return {name: getattr(ccdata, name) for name in sorted(names) if hasattr(ccdata, name)}
+
+
+def load(path, mmap=True):
+    """Load a data object saved with save().
+
+    Inputs:
+        path - name of the file to read
+        mmap - whether to memory-map the arrays read-only instead of reading them,
+               so that they are neither parsed nor copied, and processes loading
+               the same file share their memory
+    Returns:
+        a data object of the class that was saved
+    """
+
+    with zipfile.ZipFile(path) as archive:
+        members = {info.filename[:-4]: info for info in archive.infolist()
+                   if info.filename.endswith(".npy")}
+        if _header_name not in members:
+            raise ValueError("%s was not written by pychamp" % path)
+        with archive.open(members[_header_name]) as stream:
+            header = from_json(numpy.lib.format.read_array(stream, allow_pickle=False).tobytes())
+        if header["format"] != NPZ_FORMAT:
+            raise ValueError("%s has format %s instead of %s" % (path, header["format"], NPZ_FORMAT))
+
+        with open(path, "rb") as handle:
+            def read(name):
+                info = members[name]
+                if mmap and info.compress_type == zipfile.ZIP_STORED:
+                    array = _memmap(handle, path, info)
+                    if array is not None:
+                        return array
+                with archive.open(info) as stream:
+                    return numpy.lib.format.read_array(stream, allow_pickle=False)
+
+            attributes = dict(header["values"])
+            for name, (kind, keys) in header["layout"].items():
+                if kind == "array":
+                    attributes[name] = read(name)
+                elif kind == "list":
+                    attributes[name] = [read("%s.%i" % (name, i)) for i in keys]
+                else:
+                    attributes[name] = {key: read("%s.%i" % (name, i)) for i, key in enumerate(keys)}
+
+    datatype = getattr(ccdata_module, header["datatype"], ccdata_module.ccData)
+    ccdata = datatype()
+    # The attributes already have their final types, so the conversions done by
+    # the setattributes() of subclasses, like that of optdone, are not repeated.
+    ccdata_module.ccData.setattributes(ccdata, attributes)
+    return ccdata
+
+
+def to_json(value):
+    """Write a value made of lists, tuples, dictionaries and scalars as JSON.
+
+    Tuples, dictionaries with keys that are not strings, and NumPy arrays are
+    tagged so that from_json() gives them back as they were. NumPy scalars
+    become the corresponding Python scalars.
+    """
+    return json.dumps(_tag(value))
+
+
+def from_json(text):
+    """Read a value written by to_json()."""
+    return json.loads(text, object_hook=_untag)
+
+
+def _tag(value):
+    if isinstance(value, tuple):
+        return {"__tuple__": [_tag(item) for item in value]}
+    if isinstance(value, list):
+        return [_tag(item) for item in value]
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _tag(item) for key, item in value.items()}
+        return {"__items__": [[_tag(key), _tag(item)] for key, item in value.items()]}
+    if isinstance(value, numpy.ndarray):
+        return {"__array__": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return value
+
+
+def _untag(obj):
+    if "__tuple__" in obj:
+        return tuple(obj["__tuple__"])
+    if "__items__" in obj:
+        return {key: item for key, item in obj["__items__"]}
+    if "__array__" in obj:
+        return numpy.array(obj["__array__"], obj["dtype"])
+    return obj
+
+
+def _memmap(handle, path, info):
+    """Memory-map the array stored in an uncompressed archive member.
+
+    Returns None for arrays that cannot be memory-mapped, which are then read.
+    """
+
+    # The member data follows its local header, whose name and extra field
+    # lengths are at bytes 26 to 30, and starts with the .npy header.
+    handle.seek(info.header_offset)
+    local = handle.read(30)
+    namelength, extralength = struct.unpack("<HH", local[26:30])
+    handle.seek(info.header_offset + 30 + namelength + extralength)
+
+    version = numpy.lib.format.read_magic(handle)
+    if version == (1, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(handle)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(handle)
+    else:
+        return None
+    if dtype.hasobject or not shape or 0 in shape:
+        return None
+
+    order = "F" if fortran_order else "C"
+    return numpy.memmap(path, dtype=dtype, mode="r", offset=handle.tell(), shape=shape, order=order)
@@ -26,12 +26,16 @@ class Method:
         self.loglevel = loglevel
         self.logname = logname
         self._check_required_attributes()
-        self.logger = logging.getLogger('%s %s' % (self.logname, self.data))
+
+        # All instances of a method class share one logger, which gets its
+        # handler only once, rather than a new logger and handler per object.
+        self.logger = logging.getLogger('%s %s' % (self.logname, type(self).__name__))
         self.logger.setLevel(self.loglevel)
         self.logformat = "[%(name)s %(levelname)s] %(message)s"
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter(self.logformat))
-        self.logger.addHandler(handler)
+        if len(self.logger.handlers) == 0:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter(self.logformat))
+            self.logger.addHandler(handler)
 
     def _check_required_attributes(self):
         """Check if required attributes are present in data."""
@@ -12,9 +12,9 @@ from pychamp.method.calculationmethod import Method
 class Electrons(Method):
     """A container for methods pertaining to electrons."""
 
-    def __init__(self, data, progress=None, loglevel=logging.INFO, logname="Log"):
+    required_attrs = ('atomnos','charge','coreelectrons','homos')
 
-        self.required_attrs = ('atomnos','charge','coreelectrons','homos')
+    def __init__(self, data, progress=None, loglevel=logging.INFO, logname="Log"):
 
         super(Electrons, self).__init__(data, progress, loglevel, logname)
 
@@ -13,10 +13,11 @@ from pychamp.method.calculationmethod import Method
 class Orbitals(Method):
     """A class for orbital related methods."""
 
+    required_attrs = ('mocoeffs','moenergies','homos')
+
     def __init__(self, data, progress=None, \
                  loglevel=logging.INFO, logname="Log"):
 
-        self.required_attrs = ('mocoeffs','moenergies','homos')
         # Call the __init__ method of the superclass.
         super(Orbitals, self).__init__(data, progress, loglevel, logname)
         self.fragresults = None
@@ -7,6 +7,7 @@
 
 """Classes and tools for storing and handling parsed data"""
 
+import functools
 import logging
 from collections import namedtuple
 
@@ -14,11 +15,36 @@ import numpy
 
 from pychamp.method import Electrons
 from pychamp.method import orbitals
+from pychamp.parser import utils
 
 
 Attribute = namedtuple('Attribute', ['type', 'json_key', 'attribute_path'])
 
 
+def derived(*sources):
+    """Make a ccData method a property whose value is cached until a source changes.
+
+    The value is computed on first access and kept in the _derived dictionary
+    of the data object, and dropped again when any of the source attributes
+    is set or deleted. Changes made to an array in place are not noticed.
+    """
+
+    def decorator(method):
+        name = method.__name__
+
+        def getter(self):
+            cache = self._derived
+            if name not in cache:
+                cache[name] = method(self)
+            return cache[name]
+
+        getter.__doc__ = method.__doc__
+        getter.sources = frozenset(sources)
+        return property(getter)
+
+    return decorator
+
+
 class ccData:
     """Stores data extracted by cclib parsers
 
@@ -31,9 +57,17 @@ class ccData:
         atommasses -- atom masses (array[1], daltons)
         atomnos -- atomic numbers (array[1])
         atomspins -- atomic spin densities (dict of arrays[1])
+        basisprims -- exponent and contraction coefficient of each Gaussian primitive (array[2])
+        basisshells -- atom index, angular momentum, first primitive and number of primitives of each shell (array[2])
         ccenergies -- molecular energies with Coupled-Cluster corrections (array[2], eV)
         charge -- net charge of the system (integer)
+        cicoeffs -- coefficients of the CSFs in the CI vector of each state (list of arrays[1])
+        cicsfs -- indices of the CSFs in the CI vector of each state (list of arrays[1])
+        cioccupancies -- occupations of the active orbitals in these CSFs (list of arrays[2])
         coreelectrons -- number of core electrons in atom pseudopotentials (array[1])
+        csfcoeffs -- coefficients of the determinants in each CSF (array[1])
+        csfdets -- occupied orbitals of the determinants in each CSF, negative for beta (array[2])
+        csfoffsets -- index in csfdets of the first determinant of each CSF, and their number (array[1])
         dispersionenergies -- a molecular dispersion energy corrections (array[1], eV)
         enthalpy -- sum of electronic and thermal enthalpies (float, hartree/particle)
         entropy -- entropy (float, hartree/particle)
@@ -72,6 +106,7 @@ class ccData:
         nsooccnos -- natural spin orbital occupation numbers (list of array[1])
         optdone -- flags whether an optimization has converged (Boolean)
         optstatus -- optimization status for each set of atomic coordinates (array[1])
+        packedaooverlaps -- lower triangle of the overlap matrix, packed row by row (array[1])
         polarizabilities -- (dipole) polarizabilities, static or dynamic (list of arrays[2])
         pressure -- pressure used for Thermochemistry (float, atm)
         scancoords -- geometries of each scan step (array[3], angstroms)
@@ -113,9 +148,17 @@ class ccData:
        "atommasses":       Attribute(numpy.ndarray,    'mass',                        'atoms'),
        "atomnos":          Attribute(numpy.ndarray,    'number',                      'atoms:elements'),
        "atomspins":        Attribute(dict,             'spins',                       'atoms'),
+       "basisprims":       Attribute(numpy.ndarray,    'TBD',                         'N/A'),
+       "basisshells":      Attribute(numpy.ndarray,    'TBD',                         'N/A'),
        "ccenergies":       Attribute(numpy.ndarray,    'coupled cluster',             'properties:energy'),
        "charge":           Attribute(int,              'charge',                      'properties'),
+       "cicoeffs":         Attribute(list,             'TBD',                         'N/A'),
+       "cicsfs":           Attribute(list,             'TBD',                         'N/A'),
+       "cioccupancies":    Attribute(list,             'TBD',                         'N/A'),
        "coreelectrons":    Attribute(numpy.ndarray,    'core electrons',              'atoms'),
+       "csfcoeffs":        Attribute(numpy.ndarray,    'TBD',                         'N/A'),
+       "csfdets":          Attribute(numpy.ndarray,    'TBD',                         'N/A'),
+       "csfoffsets":       Attribute(numpy.ndarray,    'TBD',                         'N/A'),
        "dispersionenergies":Attribute(numpy.ndarray,   'dispersion correction',       'properties:energy'),
        "enthalpy":         Attribute(float,            'enthalpy',                    'properties'),
        "entropy":          Attribute(float,            'entropy',                     'properties'),
@@ -154,6 +197,7 @@ class ccData:
        "nsooccnos":         Attribute(list,    'TBD',                         'N/A'),
        "optdone":          Attribute(list,             'done',                        'optimization'),
        "optstatus":        Attribute(numpy.ndarray,    'status',                      'optimization'),
+       "packedaooverlaps": Attribute(numpy.ndarray,    'TBD',                         'N/A'),
        "polarizabilities": Attribute(list,             'polarizabilities',            'N/A'),
        "pressure":         Attribute(float,            'pressure',                    'properties'),
        "scancoords":       Attribute(numpy.ndarray,    'step geometry',               'optimization:scan'),
@@ -181,15 +225,31 @@ class ccData:
     # The name of all attributes can be generated from the dictionary above.
     _attrlist = sorted(_attributes.keys())
 
+    # The attributes are stored in slots rather than an instance dictionary, and
+    # the names of those that are set are kept in _present, so that the data
+    # object never has to look for its attributes among all of _attrlist.
+    __slots__ = tuple(_attrlist) + ("_present", "_deferred", "_derived")
+
     # Arrays are double precision by default, but these will be integer arrays.
-    _intarrays = ['atomnos', 'coreelectrons', 'homos', 'optstatus']
+    _intarrays = ['atomnos', 'basisshells', 'cicsfs', 'coreelectrons', 'csfoffsets', 'homos', 'optstatus']
+
+    # Integer arrays that can be very large, stored as 16-bit integers.
+    _shortintarrays = ['cioccupancies', 'csfdets']
 
     # Attributes that should be lists of arrays (double precision).
-    _listsofarrays = ['mocoeffs', 'moenergies', 'moments', 'polarizabilities', 'scfvalues']
+    _listsofarrays = ['cicoeffs', 'cicsfs', 'cioccupancies', 'mocoeffs', 'moenergies', 'moments',
+                      'polarizabilities', 'scfvalues']
 
     # Attributes that should be dictionaries of arrays (double precision).
     _dictsofarrays = ["atomcharges", "atomspins"]
 
+    # Attributes that are expanded from packed ones on first access, with the
+    # packed attributes (the first one must be set) and the function to use.
+    _packed = {
+        "aooverlaps": (("packedaooverlaps",), utils.unpack_triangle),
+        "gbasis": (("basisshells", "basisprims"), utils.expand_shells),
+    }
+
     # Possible statuses for optimization steps.
     # OPT_UNKNOWN is the default and means optimization is in progress.
     # OPT_NEW is set for every new optimization (e.g. PES, IRCs, etc.)
@@ -210,14 +270,98 @@ class ccData:
             attributes - optional dictionary of attributes to load as data
         """
 
+        object.__setattr__(self, "_present", set())
+        object.__setattr__(self, "_deferred", None)
+        object.__setattr__(self, "_derived", {})
+
         if attributes:
             self.setattributes(attributes)
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._attributes:
+            self._present.add(name)
+            if self._derived:
+                self._invalidate(name)
+
+    def __delattr__(self, name):
+        object.__delattr__(self, name)
+        self._present.discard(name)
+        if self._derived:
+            self._invalidate(name)
+
+    def _invalidate(self, name):
+        """Drop the cached derived properties computed from attribute name."""
+        cls = type(self)
+        for key in [key for key in self._derived if name in getattr(cls, key).fget.sources]:
+            del self._derived[key]
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self._present}
+        state["_deferred"] = self._deferred
+        return state
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "_present", set())
+        object.__setattr__(self, "_derived", {})
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __getattr__(self, name):
+        """Load a deferred attribute the first time it is accessed."""
+
+        # Only called when normal attribute lookup fails, which includes unset slots.
+        if name.startswith("_"):
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        deferred = self._deferred
+        if not deferred or deferred.get(name) is None:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
+        loader, names = deferred[name]
+        for attr in names:
+            deferred.pop(attr, None)
+        self.setattributes(loader())
+
+        # The loaded attributes may themselves defer others (see setattributes).
+        return getattr(self, name)
+
+    def defer(self, names, loader):
+        """Register a loader for attributes that are decoded on first access.
+
+        The loader is called without arguments the first time any of the named
+        attributes is accessed, and should return a dictionary of attributes.
+        Attributes that were discarded are not deferred again.
+        """
+
+        if self._deferred is None:
+            self._deferred = {}
+        for name in names:
+            if name not in self._deferred or self._deferred[name] is not None:
+                self._deferred[name] = (loader, names)
+
+    def discard(self, names):
+        """Delete attributes, and keep them from being loaded or expanded later.
+
+        This is how parse(exclude=...) leaves out attributes that would otherwise
+        be expanded from others on first access, such as aooverlaps.
+        """
+
+        if self._deferred is None:
+            self._deferred = {}
+        for name in names:
+            if name in self._present:
+                delattr(self, name)
+            self._deferred[name] = None
+
+    def _expand(self, name):
+        """Build an attribute listed in _packed from its packed attributes."""
+        sources, expand = self._packed[name]
+        return {name: expand(*[getattr(self, source) for source in sources])}
+
     def listify(self):
         """Converts all attributes that are arrays or lists/dicts of arrays to lists."""
 
-        attrlist = [k for k in self._attrlist if hasattr(self, k)]
-        for k in attrlist:
+        for k in sorted(self._present):
             v = self._attributes[k].type
             if v == numpy.ndarray:
                 setattr(self, k, getattr(self, k).tolist())
@@ -228,23 +372,54 @@ class ccData:
                 pairs = [(key, val.tolist()) for key, val in items]
                 setattr(self, k, dict(pairs))
 
-    def arrayify(self):
-        """Converts appropriate attributes to arrays or lists/dicts of arrays."""
+    @classmethod
+    def _arrayschema(cls):
+        """Return how arrayify() converts attributes, as a dictionary.
 
-        attrlist = [k for k in self._attrlist if hasattr(self, k)]
-        for k in attrlist:
-            v = self._attributes[k].type
-            precision = 'd'
-            if k in self._intarrays:
-                precision = 'i'
+        The values are (type, dtype) pairs, where the type is numpy.ndarray,
+        list or dict for arrays, lists of arrays and dictionaries of arrays.
+        This is worked out once for each class and then reused.
+        """
+
+        schema = cls.__dict__.get("_schema")
+        if schema is None:
+            schema = {}
+            for k in cls._attrlist:
+                v = cls._attributes[k].type
+                precision = 'd'
+                if k in cls._intarrays:
+                    precision = 'i'
+                if k in cls._shortintarrays:
+                    precision = 'h'
+                if v == numpy.ndarray \
+                        or (v == list and k in cls._listsofarrays) \
+                        or (v == dict and k in cls._dictsofarrays):
+                    schema[k] = (v, numpy.dtype(precision))
+            cls._schema = schema
+        return schema
+
+    def arrayify(self, names=None):
+        """Converts appropriate attributes to arrays or lists/dicts of arrays.
+
+        Arrays that already have the right dtype are kept as they are, not
+        copied. Only the attributes in names are converted, if it is given.
+
+        Inputs:
+            names - optional list of attribute names to convert
+        """
+
+        schema = self._arrayschema()
+        if names is None:
+            names = self._present
+        for k in [k for k in names if k in schema and k in self._present]:
+            v, precision = schema[k]
+            value = getattr(self, k)
             if v == numpy.ndarray:
-                setattr(self, k, numpy.array(getattr(self, k), precision))
-            elif v == list and k in self._listsofarrays:
-                setattr(self, k, [numpy.array(x, precision) for x in getattr(self, k)])
-            elif v == dict and k in self._dictsofarrays:
-                items = getattr(self, k).items()
-                pairs = [(key, numpy.array(val, precision)) for key, val in items]
-                setattr(self, k, dict(pairs))
+                setattr(self, k, numpy.asarray(value, precision))
+            elif v == list:
+                setattr(self, k, [numpy.asarray(x, precision) for x in value])
+            else:
+                setattr(self, k, {key: numpy.asarray(val, precision) for key, val in value.items()})
 
     def getattributes(self, tolists=False):
         """Returns a dictionary of existing data attributes.
@@ -255,8 +430,9 @@ class ccData:
 
         if tolists:
             self.listify()
+        # Deferred attributes are loaded here, and then become present.
         attributes = {}
-        for attr in self._attrlist:
+        for attr in sorted(self._present.union(self._deferred or ())):
             if hasattr(self, attr):
                 attributes[attr] = getattr(self, attr)
         if tolists:
@@ -282,20 +458,27 @@ class ccData:
         for attr in valid:
             setattr(self, attr, attributes[attr])
 
-        self.arrayify()
-        self.typecheck()
+        # The dense overlap matrix and the nested gbasis lists are only expanded
+        # from their packed forms when used.
+        for name, (sources, expand) in self._packed.items():
+            if sources[0] in attributes and name not in attributes:
+                self.defer((name,), functools.partial(self._expand, name))
+
+        self.typecheck(valid)
 
         return invalid
 
-    def typecheck(self):
-        """Check the types of all attributes.
+    def typecheck(self, names=None):
+        """Check the types of all attributes, or only those in names.
 
         If an attribute does not match the expected type, then attempt to
         convert; if that fails, only then raise a TypeError.
         """
 
-        self.arrayify()
-        for attr in [a for a in self._attrlist if hasattr(self, a)]:
+        self.arrayify(names)
+        if names is None:
+            names = self._present
+        for attr in [a for a in names if a in self._present]:
 
             val = getattr(self, attr)
             if type(val) == self._attributes[attr].type:
@@ -331,6 +514,19 @@ class ccData:
         return outputstr
 
 
+    def save(self, path):
+        """Save the attributes to an uncompressed NumPy archive (see io.npzio)."""
+
+        from pychamp.io import npzio
+        npzio.save(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a data object saved with save(), memory-mapping its arrays if mmap."""
+
+        from pychamp.io import npzio
+        return npzio.load(path, mmap=mmap)
+
     def writexyz(self, filename=None, indices=None):
         """Write parsed attributes to an XML file."""
         return self.write(filename=filename, indices=indices,
@@ -397,27 +593,27 @@ class ccData:
         else:
             return self.atomcoords
 
-    @property
+    @derived(*Electrons.required_attrs)
     def nelectrons(self):
         return Electrons(self).count()
 
-    @property
+    @derived(*Electrons.required_attrs)
     def number_alpha(self):
         return Electrons(self).alpha()
 
-    @property
+    @derived(*Electrons.required_attrs)
     def number_beta(self):
-        return Electrons(self).beta()        
+        return Electrons(self).beta()
 
-    @property
+    @derived(*Electrons.required_attrs)
     def number_alpha_valence(self):
-        return Electrons(self).alpha_valence() 
+        return Electrons(self).alpha_valence()
 
-    @property
+    @derived(*Electrons.required_attrs)
     def number_beta_valence(self):
-        return Electrons(self).beta_valence()        
+        return Electrons(self).beta_valence()
 
-    @property
+    @derived(*orbitals.Orbitals.required_attrs)
     def closed_shell(self):
         return orbitals.Orbitals(self).closed_shell()
 
@@ -425,15 +621,17 @@ class ccData:
 class ccData_optdone_bool(ccData):
     """This is the version of ccData where optdone is a Boolean."""
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
 
         super(ccData_optdone_bool, self).__init__(*args, **kwargs)
         self._attributes["optdone"] = Attribute(bool, 'done', 'optimization')
 
-    def setattributes(self, *args, **kwargs):
-        invalid = super(ccData_optdone_bool, self).setattributes(*args, **kwargs)
+    def setattributes(self, attributes):
+        invalid = super(ccData_optdone_bool, self).setattributes(attributes)
 
         # Reduce optdone to a Boolean, because it will be parsed as a list. If this list has any element,
         # it means that there was an optimized structure and optdone should be True.
-        if hasattr(self, 'optdone'):
+        if 'optdone' in attributes:
             self.optdone = len(self.optdone) > 0
@@ -52,13 +52,130 @@ class GAMESS(logfileparser.Logfile):
                 'BFD-Tpa_nof'   : 'VTZaugnof', \
                 'BFD-Qpa_nof'   : 'VQZaugnof'}
 
-
+    # Used to split the labels of the basis functions in the EIGENVECTORS section.
+    re_aoname = re.compile(r"(\d+)\s*([A-Z][A-Z]?)\s*(\d+)\s*([A-Z]+)")
+
+    # Section triggers used by dispatch_sections(), as (keyword, handler) pairs, or
+    # (keyword, handler, flags) triples for the few matched in any case.
+    # A handler is only called for lines that contain its keyword, and handlers
+    # are tried in the order listed here, which is the order they had in the
+    # original monolithic extract(). Each handler still performs its own exact
+    # check on the line, and returns the line it stopped at (or None to skip the
+    # remaining handlers for this line).
+    section_triggers = [
+        ("INPUT CARD>",                                     "_extract_input_card"),
+        ("GAMESS VERSION =",                                "_extract_version"),
+        ("SCFTYP",                                          "_extract_methods"),
+        ("GBASIS",                                          "_extract_basis_name"),
+        ("OPTTOL =",                                        "_extract_geotargets"),
+        ("FINAL",                                           "_extract_scfenergies"),
+        ("GRIMME'S DISPERSION ENERGY",                      "_extract_dispersion"),
+        ("Dispersion correction to total energy",           "_extract_dispersion"),
+        ("CHARGE OF MOLECULE",                              "_extract_charge"),
+        ("EXCITATION ENERGIES",                             "_extract_etenergies"),
+        ("RESULTS FROM",                                    "_extract_cihamtyp"),
+        ("EXCITED STATE",                                   "_extract_etsecs"),
+        ("TRANSITION FROM THE GROUND STATE",                "_extract_etoscs"),
+        ("LET EXCITATIONS",                                 "_extract_tddft"),
+        ("ATOMIC                      COORDINATES",         "_extract_input_coords"),
+        ("EQUILIBRIUM GEOMETRY LOCATED",                    "_extract_optdone"),
+        ("GEOMETRY SEARCH IS NOT CONVERGED",                "_extract_optnotdone"),
+        ("COORDINATES OF ALL ATOMS ARE",                    "_extract_atomcoords"),
+        (" SCF CALCULATION",                                "_extract_scf"),
+        ("ITER EX",                                         "_extract_scf_iterations"),
+        ("ATOMIC BASIS SET",                                "_extract_gbasis"),
+        ("EIGENVECTORS",                                    "_extract_mocoeffs"),
+        ("MOLECULAR ORBITALS",                              "_extract_mocoeffs"),
+        ("NUMBER OF OCCUPIED ORBITALS",                     "_extract_homos"),
+        ("SYMMETRIES FOR INITIAL GUESS ORBITALS FOLLOW",    "_extract_initial_guess"),
+        # FMO jobs print this in lower case (see exam37), so any case is matched.
+        ("NUMBER OF ATOMS",                                 "_extract_natom", re.IGNORECASE),
+        ("NUMBER OF CARTESIAN GAUSSIAN BASIS",              "_extract_nbasis"),
+        ("TOTAL NUMBER OF BASIS FUNCTIONS",                 "_extract_nbasis"),
+        ("TOTAL NUMBER OF CONTAMINANTS DROPPED",            "_extract_contaminants"),
+        ("SPHERICAL HARMONICS KEPT IN THE VARIATION SPACE", "_extract_spherical"),
+        ("TOTAL NUMBER OF MOS IN VARIATION SPACE",          "_extract_nmo"),
+        ("OVERLAP MATRIX",                                  "_extract_aooverlaps"),
+        ("DETERMINANT CONTRIBUTION TO CSF'S",               "_extract_csfs"),
+        ("STATE #",                                         "_extract_civectors"),
+        ("ECP POTENTIALS",                                  "_extract_coreelectrons"),
+        ("ddikick.x: exited gracefully.",                   "_extract_success"),
+        ("EXECUTION OF GAMESS TERMINATED NORMALLY",         "_extract_success"),
+    ]
+
+    # The bulky sections, which parse(lazy=True) decodes only on first access.
+    # The optimisation flags are grouped with the coordinates, because they
+    # decide which standard orientations are kept.
+    lazy_sections = [
+        (("_extract_input_coords", "_extract_optdone", "_extract_optnotdone", "_extract_atomcoords"),
+            ("atomcoords", "atomnos", "optdone"), False),
+        (("_extract_scf", "_extract_scf_iterations"),
+            ("scftargets", "scfvalues", "scftype"), False),
+        (("_extract_gbasis",),
+            ("basisshells", "basisprims", "gbasis"), True),
+        (("_extract_mocoeffs",),
+            ("mocoeffs", "moenergies", "mosyms", "atombasis", "aonames"), True),
+        (("_extract_aooverlaps",),
+            ("packedaooverlaps", "aooverlaps"), True),
+        (("_extract_csfs",),
+            ("csfoffsets", "csfcoeffs", "csfdets"), True),
+        (("_extract_civectors",),
+            ("cicsfs", "cicoeffs", "cioccupancies"), False),
+    ]
+
+    # The attributes set by the section handlers, and those they depend on.
+    section_attributes = {
+        "_extract_geotargets":      ("geotargets",),
+        "_extract_scfenergies":     ("scfenergies",),
+        "_extract_dispersion":      ("dispersionenergies",),
+        "_extract_charge":          ("charge", "mult"),
+        "_extract_etenergies":      ("etenergies", "etoscs"),
+        "_extract_etsecs":          ("etsecs", "etsyms"),
+        "_extract_etoscs":          ("etoscs",),
+        "_extract_tddft":           ("etenergies", "etoscs", "etsecs", "etsyms"),
+        "_extract_input_coords":    ("atomcoords", "atomnos"),
+        "_extract_optdone":         ("optdone",),
+        "_extract_optnotdone":      ("optdone",),
+        "_extract_atomcoords":      ("atomcoords",),
+        "_extract_scf":             ("scftargets", "scfvalues", "scftype"),
+        "_extract_scf_iterations":  ("scftargets", "scfvalues"),
+        "_extract_gbasis":          ("basisshells", "basisprims", "gbasis"),
+        "_extract_mocoeffs":        ("mocoeffs", "moenergies", "mosyms", "atombasis", "aonames"),
+        "_extract_homos":           ("homos",),
+        "_extract_initial_guess":   ("homos",),
+        "_extract_natom":           ("natom",),
+        "_extract_nbasis":          ("nbasis",),
+        "_extract_contaminants":    ("nmo",),
+        "_extract_spherical":       ("nmo",),
+        "_extract_nmo":             ("nmo",),
+        "_extract_aooverlaps":      ("packedaooverlaps", "aooverlaps"),
+        "_extract_csfs":            ("csfoffsets", "csfcoeffs", "csfdets"),
+        "_extract_civectors":       ("cicsfs", "cicoeffs", "cioccupancies"),
+        "_extract_coreelectrons":   ("coreelectrons",),
+    }
+    section_requires = {
+        "_extract_atomcoords":      ("natom", "optdone"),
+        "_extract_scf_iterations":  ("scftargets",),
+        "_extract_mocoeffs":        ("natom", "nbasis", "nmo"),
+        "_extract_contaminants":    ("nbasis",),
+        "_extract_aooverlaps":      ("nbasis",),
+        "_extract_coreelectrons":   ("natom",),
+    }
+
+    # GAMESS prints these once per job, and natom is only ever set once.
+    final_when_set = ("natom", "nbasis", "charge", "mult")
+
+    # Every job starts with the program banner (see split_jobs).
+    job_boundary = re.compile(rb"GAMESS VERSION =")
 
     def __init__(self, *args, **kwargs):
 
         # Call the __init__ method of the superclass
         super(GAMESS, self).__init__(logname="GAMESS", *args, **kwargs)
 
+        # CI coefficients smaller than this in magnitude are dropped while parsing.
+        self.ci_threshold = kwargs.get("ci_threshold", 0.0)
+
     def __str__(self):
         """Return a string representation of the object."""
         return "GAMESS log file %s" % (self.filename)
@@ -91,6 +208,19 @@ class GAMESS(logfileparser.Logfile):
     def extract(self, inputfile, line):
         """Extract information from the file object inputfile."""
 
+        self.dispatch_sections(inputfile, line)
+
+    def _extract_input_card(self, inputfile, line):
+        """Stop at echoed input cards, which can contain other triggers."""
+
+        if line[1:12] == "INPUT CARD>":
+            return None
+
+        return line
+
+    def _extract_version(self, inputfile, line):
+        """Extract the GAMESS version from the program banner."""
+
         if "GAMESS VERSION =" in line:
             # ...so avoid overwriting it if Firefly already set this field.
             if "package_version" not in self.metadata:
@@ -107,8 +237,10 @@ class GAMESS(logfileparser.Logfile):
                 self.metadata["package_version"] = '{}.r{}'.format(year, release)
                 self.metadata["legacy_package_version"] = "{}R{}".format(year, release)
 
-        if line[1:12] == "INPUT CARD>":
-            return
+        return line
+
+    def _extract_methods(self, inputfile, line):
+        """Extract the calculation method from the SCFTYP keyword."""
 
         # extract the methods
         if line[1:7] == "SCFTYP":
@@ -125,6 +257,10 @@ class GAMESS(logfileparser.Logfile):
                 if len(self.metadata["methods"]) == 0:
                     self.metadata["methods"].append(method)
 
+        return line
+
+    def _extract_basis_name(self, inputfile, line):
+        """Extract the name of the basis set from the GBASIS keyword."""
 
         # extract the basis set name
         if line[5:11] == "GBASIS":
@@ -192,6 +328,11 @@ class GAMESS(logfileparser.Logfile):
                     if line.split()[2] == "6" and line.split()[3] == "POLAR=NONE":
                         self.metadata["basis_set"] = "6-311G"
 
+        return line
+
+    def _extract_geotargets(self, inputfile, line):
+        """Extract the geometry optimisation convergence targets."""
+
         # We are looking for this line:
         #           PARAMETERS CONTROLLING GEOMETRY SEARCH ARE
         #           ...
@@ -201,16 +342,27 @@ class GAMESS(logfileparser.Logfile):
                 opttol = float(line.split()[2])
                 self.geotargets = numpy.array([opttol, 3. / opttol], "d")
 
+        return line
+
+    def _extract_scfenergies(self, inputfile, line):
+        """Extract the final SCF energies."""
+
         # Has to deal with such lines as:
         #  FINAL R-B3LYP ENERGY IS     -382.0507446475 AFTER  10 ITERATIONS
         #  FINAL ENERGY IS     -379.7594673378 AFTER   9 ITERATIONS
         # ...so take the number after the "IS"
         if line.find("FINAL") == 1:
             if not hasattr(self, "scfenergies"):
-                self.scfenergies = []
+                self.scfenergies = utils.GrowableArray()
             temp = line.split()
 ####        self.scfenergies.append(utils.convertor(float(temp[temp.index("IS") + 1]), "hartree", "eV"))
             self.scfenergies.append(float(temp[temp.index("IS") + 1]))            
+
+        return line
+
+    def _extract_dispersion(self, inputfile, line):
+        """Extract empirical dispersion energies."""
+
         # Empirical dispersion: first is GAMESS-US, second is Firefly
         if any(
             line.find(dispersion_trigger) == 1
@@ -221,7 +373,10 @@ class GAMESS(logfileparser.Logfile):
             dispersion = utils.convertor(float(line.split()[-1]), "hartree", "eV")
             self.append_attribute("dispersionenergies", dispersion)
 
+        return line
 
+    def _extract_charge(self, inputfile, line):
+        """Extract the charge and multiplicity."""
 
         # Extract charge and multiplicity
         if line[1:19] == "CHARGE OF MOLECULE":
@@ -233,6 +388,11 @@ class GAMESS(logfileparser.Logfile):
             mult = int(line.split()[-1])
             self.set_attribute('mult', mult)
 
+        return line
+
+    def _extract_etenergies(self, inputfile, line):
+        """Extract CIS and TD-DFT excitation energies."""
+
         # Electronic transitions (etenergies) for CIS runs and TD-DFT, which
         # have very similar outputs. The outputs EOM look very differentm, though.
         #
@@ -270,6 +430,11 @@ class GAMESS(logfileparser.Logfile):
                     self.etoscs.append(etosc)
                 broken = next(inputfile).split()
 
+        return line
+
+    def _extract_cihamtyp(self, inputfile, line):
+        """Detect the CI hamiltonian type."""
+
         # Detect the CI hamiltonian type, if applicable.
         # Should always be detected if CIS is done.
         if line[8:64] == "RESULTS FROM SPIN-ADAPTED ANTISYMMETRIZED PRODUCT (SAPS)":
@@ -277,6 +442,11 @@ class GAMESS(logfileparser.Logfile):
         if line[8:64] == "RESULTS FROM DETERMINANT BASED ATOMIC ORBITAL CI-SINGLES":
             self.cihamtyp = "dets"
 
+        return line
+
+    def _extract_etsecs(self, inputfile, line):
+        """Extract singly-excited configurations for CIS runs."""
+
         # etsecs (used only for CIS runs for now)
         if line[1:14] == "EXCITED STATE":
             if not hasattr(self, 'etsecs'):
@@ -314,6 +484,11 @@ class GAMESS(logfileparser.Logfile):
                 line = next(inputfile)
             self.etsecs.append(CIScontribs)
 
+        return line
+
+    def _extract_etoscs(self, inputfile, line):
+        """Extract oscillator strengths for CIS runs."""
+
         # etoscs (used only for CIS runs now)
         if line[1:50] == "TRANSITION FROM THE GROUND STATE TO EXCITED STATE":
             if not hasattr(self, "etoscs"):
@@ -333,6 +508,11 @@ class GAMESS(logfileparser.Logfile):
                 strength = float(line.split()[3])
                 self.etoscs.append(strength)
 
+        return line
+
+    def _extract_tddft(self, inputfile, line):
+        """Extract TD-DFT excitations for GAMESS-US."""
+
         # TD-DFT for GAMESS-US.
         # The format for excitations has changed a bit between 2007 and 2012.
         # Original format parser was written for:
@@ -434,46 +614,51 @@ class GAMESS(logfileparser.Logfile):
             if etsyms:
                 self.etsyms = etsyms
 
-        # # Maximum and RMS gradients.
-        # if "MAXIMUM GRADIENT" in line or "RMS GRADIENT" in line:
+        return line
+
+    # # Maximum and RMS gradients.
+    # if "MAXIMUM GRADIENT" in line or "RMS GRADIENT" in line:
+
+    #     parts = line.split()
 
-        #     parts = line.split()
+    #     # Avoid parsing the following...
 
-        #     # Avoid parsing the following...
+    #     ## YOU SHOULD RESTART "OPTIMIZE" RUNS WITH THE COORDINATES
+    #     ## WHOSE ENERGY IS LOWEST.  RESTART "SADPOINT" RUNS WITH THE
+    #     ## COORDINATES WHOSE RMS GRADIENT IS SMALLEST.  THESE ARE NOT
+    #     ## ALWAYS THE LAST POINT COMPUTED!
 
-        #     ## YOU SHOULD RESTART "OPTIMIZE" RUNS WITH THE COORDINATES
-        #     ## WHOSE ENERGY IS LOWEST.  RESTART "SADPOINT" RUNS WITH THE
-        #     ## COORDINATES WHOSE RMS GRADIENT IS SMALLEST.  THESE ARE NOT
-        #     ## ALWAYS THE LAST POINT COMPUTED!
+    #     if parts[0] not in ["MAXIMUM", "RMS", "(1)"]:
+    #         return
 
-        #     if parts[0] not in ["MAXIMUM", "RMS", "(1)"]:
-        #         return
+    #     if not hasattr(self, "geovalues"):
+    #         self.geovalues = []
 
-        #     if not hasattr(self, "geovalues"):
-        #         self.geovalues = []
+    #     # Newer versions (around 2006) have both maximum and RMS on one line:
+    #     #       MAXIMUM GRADIENT =  0.0531540    RMS GRADIENT = 0.0189223
+    #     if len(parts) == 8:
+    #         maximum = float(parts[3])
+    #         rms = float(parts[7])
 
-        #     # Newer versions (around 2006) have both maximum and RMS on one line:
-        #     #       MAXIMUM GRADIENT =  0.0531540    RMS GRADIENT = 0.0189223
-        #     if len(parts) == 8:
-        #         maximum = float(parts[3])
-        #         rms = float(parts[7])
+    #     # In older versions of GAMESS, this spanned two lines, like this:
+    #     #       MAXIMUM GRADIENT =    0.057578167
+    #     #           RMS GRADIENT =    0.027589766
+    #     if len(parts) == 4:
+    #         maximum = float(parts[3])
+    #         line = next(inputfile)
+    #         parts = line.split()
+    #         rms = float(parts[3])
 
-        #     # In older versions of GAMESS, this spanned two lines, like this:
-        #     #       MAXIMUM GRADIENT =    0.057578167
-        #     #           RMS GRADIENT =    0.027589766
-        #     if len(parts) == 4:
-        #         maximum = float(parts[3])
-        #         line = next(inputfile)
-        #         parts = line.split()
-        #         rms = float(parts[3])
+    #     # FMO also prints two final one- and two-body gradients (see exam37):
+    #     #   (1) MAXIMUM GRADIENT =  0.0531540    RMS GRADIENT = 0.0189223
+    #     if len(parts) == 9:
+    #         maximum = float(parts[4])
+    #         rms = float(parts[8])
 
-        #     # FMO also prints two final one- and two-body gradients (see exam37):
-        #     #   (1) MAXIMUM GRADIENT =  0.0531540    RMS GRADIENT = 0.0189223
-        #     if len(parts) == 9:
-        #         maximum = float(parts[4])
-        #         rms = float(parts[8])
+    #     self.geovalues.append([maximum, rms])
 
-        #     self.geovalues.append([maximum, rms])
+    def _extract_input_coords(self, inputfile, line):
+        """Extract the input orientation of the atoms."""
 
         # This is the input orientation, which is the only data available for
         # SP calcs, but which should be overwritten by the standard orientation
@@ -481,20 +666,25 @@ class GAMESS(logfileparser.Logfile):
         if line[11:50] == "ATOMIC                      COORDINATES":
 
             if not hasattr(self, "atomcoords"):
-                self.atomcoords = []
+                self.atomcoords = utils.GrowableArray()
 
             line = next(inputfile)
-            atomcoords = []
-            atomnos = []
+            rows = []
             line = next(inputfile)
             while line.strip():
-                temp = line.strip().split()
-                atomcoords.append([utils.convertor(float(x), "bohr", "Angstrom") for x in temp[2:5]])
-                atomnos.append(int(round(float(temp[1]))))  # Don't use the atom name as this is arbitary
+                rows.append(line.split()[1:5])
                 line = next(inputfile)
+            rows = numpy.array(rows, "d").reshape(-1, 4)
 
+            # Don't use the atom name as this is arbitary
+            atomnos = [int(n) for n in numpy.round(rows[:, 0])]
             self.set_attribute('atomnos', atomnos)
-            self.atomcoords.append(atomcoords)
+            self.atomcoords.append(utils.convertor(rows[:, 1:], "bohr", "Angstrom"))
+
+        return line
+
+    def _extract_optdone(self, inputfile, line):
+        """Flag a converged geometry optimisation."""
 
         if line[12:40] == "EQUILIBRIUM GEOMETRY LOCATED":
             # Prevent extraction of the final geometry twice
@@ -502,11 +692,21 @@ class GAMESS(logfileparser.Logfile):
                 self.optdone = []
             self.optdone.append(len(self.geovalues) - 1)
 
+        return line
+
+    def _extract_optnotdone(self, inputfile, line):
+        """Flag an unconverged geometry optimisation."""
+
         # Make sure we always have optdone for geomtry optimization, even if not converged.
         if "GEOMETRY SEARCH IS NOT CONVERGED" in line:
             if not hasattr(self, 'optdone'):
                 self.optdone = []
 
+        return line
+
+    def _extract_atomcoords(self, inputfile, line):
+        """Extract the coordinates of a geometry optimisation step."""
+
         # This is the standard orientation, which is the only coordinate
         # information available for all geometry optimisation cycles.
         # The input orientation will be overwritten if this is a geometry optimisation
@@ -519,18 +719,22 @@ class GAMESS(logfileparser.Logfile):
             if self.firststdorient:
                 self.firststdorient = False
                 # Wipes out the single input coordinate at the start of the file
-                self.atomcoords = []
+                self.atomcoords = utils.GrowableArray()
 
             self.skip_lines(inputfile, ['line', '-'])
 
-            atomcoords = []
+            rows = []
             line = next(inputfile)
 
             for i in range(self.natom):
-                temp = line.strip().split()
-                atomcoords.append(list(map(float, temp[2:5])))
+                rows.append(line.split()[2:5])
                 line = next(inputfile)
-            self.atomcoords.append(atomcoords)
+            self.atomcoords.append(numpy.array(rows, "d"))
+
+        return line
+
+    def _extract_scf(self, inputfile, line):
+        """Extract SCF convergence targets and values."""
 
         # Section with SCF information.
         #
@@ -603,7 +807,7 @@ class GAMESS(logfileparser.Logfile):
             #   * * *   INITIATING DIIS PROCEDURE   * * *
             #   CONVERGED TO SWOFF, SO DFT CALCULATION IS NOW SWITCHED ON
             #   DFT CODE IS SWITCHING BACK TO THE FINER GRID
-            values = []
+            values = utils.GrowableArray()
             while line.strip():
                 try:
                     temp = int(line[0:4])
@@ -621,8 +825,12 @@ class GAMESS(logfileparser.Logfile):
                 except StopIteration:
                     self.logger.warning('File terminated before end of last SCF!')
                     break
-            self.scfvalues.append(values)
+            self.scfvalues.append(values.array)
 
+        return line
+
+    def _extract_scf_iterations(self, inputfile, line):
+        """Extract SCF values printed without a banner."""
 
         # Sometimes, only the first SCF cycle has the banner parsed for above,
         # so we must identify them from the header before the SCF iterations.
@@ -633,7 +841,7 @@ class GAMESS(logfileparser.Logfile):
             # they do not change.
             self.scftargets.append(self.scftargets[-1])
 
-            values = []
+            values = utils.GrowableArray()
             line = next(inputfile)
             while line.strip():
                 try:
@@ -643,12 +851,24 @@ class GAMESS(logfileparser.Logfile):
                 else:
                     values.append([float(line.split()[self.scf_valcol])])
                 line = next(inputfile)
-            self.scfvalues.append(values)
+            self.scfvalues.append(values.array)
 
+        return line
 
+    def _extract_gbasis(self, inputfile, line):
+        """Extract the Gaussian basis set."""
 
         if line[5:21] == "ATOMIC BASIS SET":
-            self.gbasis = []
+
+            # The basis is stored as a table of shells, with a row (atom, angular
+            # momentum, primitive offset, primitive count) for each shell, and a
+            # table of primitives. Atoms with the same basis, which is usually
+            # the case for atoms of the same element, share their primitives.
+            shells = []
+            primitives = []
+            offsets = {}
+            natom = 0
+
             line = next(inputfile)
             while line.find("SHELL") < 0:
                 line = next(inputfile)
@@ -700,10 +920,26 @@ class GAMESS(logfileparser.Logfile):
                 # either the start of the next block or the start of a new atom or
                 # the end of the basis function section
 
+                key = tuple((sym, tuple(prims)) for sym, prims in gbasis)
+                if key not in offsets:
+                    offsets[key] = []
+                    for sym, prims in gbasis:
+                        offsets[key].append((utils.shell_labels.index(sym), len(primitives), len(prims)))
+                        primitives.extend(prims)
+
                 numtoadd = 1 + (shellgap // shellsize)
                 shellcounter = shellno + shellsize
                 for x in range(numtoadd):
-                    self.gbasis.append(gbasis)
+                    shells.extend((natom, l, offset, count) for l, offset, count in offsets[key])
+                    natom += 1
+
+            self.basisshells = numpy.array(shells, "i").reshape(-1, 4)
+            self.basisprims = numpy.array(primitives, "d").reshape(-1, 2)
+
+        return line
+
+    def _extract_mocoeffs(self, inputfile, line):
+        """Extract MO coefficients, energies and symmetries."""
 
         # The eigenvectors, which also include MO energies and symmetries, follow
         # the *final* report of evalues and the last list of symmetries in the log file:
@@ -801,7 +1037,8 @@ class GAMESS(logfileparser.Logfile):
                 # Eigenvalues for these orbitals (in hartrees).
                 try:
 ####                self.moenergies[0].extend([utils.convertor(float(x), "hartree", "eV") for x in line.split()])
-                    self.moenergies[0].extend([float(x) for x in line.split()])
+                    energies = [float(x) for x in line.split()]
+                    self.moenergies[0].extend(energies)
                 except:
                     self.logger.warning('MO section found but could not be parsed!')
                     break
@@ -811,12 +1048,8 @@ class GAMESS(logfileparser.Logfile):
                 if line.strip():
                     self.mosyms[0].extend(list(map(self.normalisesym, line.split())))
 
-                # Now we have nbasis lines. We will use the same method as in normalise_aonames() before.
-                p = re.compile(r"(\d+)\s*([A-Z][A-Z]?)\s*(\d+)\s*([A-Z]+)")
-                oldatom = '0'
-                i_atom = 0  # counter to keep track of n_atoms > 99
-                flag_w = True  # flag necessary to keep from adding 100's at wrong time
-
+                # Now we have nbasis lines.
+                rows = []
                 for i in range(self.nbasis):
                     line = next(inputfile)
 
@@ -824,12 +1057,20 @@ class GAMESS(logfileparser.Logfile):
                     if not line.strip():
                         break
 
-                    # Fill atombasis and aonames only first time around
-                    if readatombasis and base == 0:
+                    rows.append(line)
+
+                # Fill atombasis and aonames only first time around.
+                # We will use the same method as in normalise_aonames() before.
+                if readatombasis and base == 0:
+
+                    oldatom = '0'
+                    i_atom = 0  # counter to keep track of n_atoms > 99
+                    flag_w = True  # flag necessary to keep from adding 100's at wrong time
+
+                    for row in rows:
 
-                        aonames = []
-                        start = line[:17].strip()
-                        m = p.search(start)
+                        start = row[:17].strip()
+                        m = self.re_aoname.search(start)
 
                         if m:
                             g = m.groups()
@@ -851,7 +1092,7 @@ class GAMESS(logfileparser.Logfile):
                             atomno = g2-1
                             orbno = int(g[0])-1
                         else:  # For F orbitals, as shown above
-                            g = [x.strip() for x in line.split()]
+                            g = [x.strip() for x in row.split()]
                             aoname = "%s%s_%s" % (g[1].capitalize(), oldatom, g[2])
                             atomno = int(oldatom)-1
                             orbno = int(g[0])-1
@@ -859,11 +1100,9 @@ class GAMESS(logfileparser.Logfile):
                         self.atombasis[atomno].append(orbno)
                         self.aonames.append(aoname)
 
-                    coeffs = line[15:]  # Strip off the crud at the start.
-                    j = 0
-                    while j*11+4 < len(coeffs):
-                        self.mocoeffs[0][base+j, i] = float(coeffs[j * 11:(j + 1) * 11])
-                        j += 1
+                # Strip off the crud at the start, and decode all coefficients of the block at once.
+                coeffs = utils.fixed_width_floats(rows, 11, len(energies), start=15)
+                self.mocoeffs[0][base:base + len(energies), :len(rows)] = coeffs.T
 
             # If it's a restricted calc and no more properties, we have:
             #
@@ -915,19 +1154,24 @@ class GAMESS(logfileparser.Logfile):
                     if "properties" in line.lower():
                         break
 ###                 self.moenergies[1].extend([utils.convertor(float(x), "hartree", "eV") for x in line.split()])
-                    self.moenergies[1].extend([float(x) for x in line.split()])                    
+                    energies = [float(x) for x in line.split()]
+                    self.moenergies[1].extend(energies)
                     line = next(inputfile)
                     self.mosyms[1].extend(list(map(self.normalisesym, line.split())))
+                    rows = []
                     for i in range(self.nbasis):
                         line = next(inputfile)
-                        temp = line[15:]  # Strip off the crud at the start
-                        j = 0
-                        while j * 11 + 4 < len(temp):
-                            self.mocoeffs[1][base+j, i] = float(temp[j * 11:(j + 1) * 11])
-                            j += 1
+                        rows.append(line)
+                    # Strip off the crud at the start, and decode the whole block.
+                    coeffs = utils.fixed_width_floats(rows, 11, len(energies), start=15)
+                    self.mocoeffs[1][base:base + len(energies)] = coeffs.T
                 line = next(inputfile)
             self.moenergies = [numpy.array(x, "d") for x in self.moenergies]
 
+        return line
+
+    def _extract_homos(self, inputfile, line):
+        """Extract the number of occupied orbitals."""
 
         # We cannot trust this self.homos until we come to the phrase:
         #   SYMMETRIES FOR INITAL GUESS ORBITALS FOLLOW
@@ -943,6 +1187,11 @@ class GAMESS(logfileparser.Logfile):
 
             self.set_attribute('homos', homos)
 
+        return line
+
+    def _extract_initial_guess(self, inputfile, line):
+        """Check whether the initial guess is restricted."""
+
         if line.find("SYMMETRIES FOR INITIAL GUESS ORBITALS FOLLOW") >= 0:
             # Not unrestricted, so lop off the second index.
             # In case the search string above was not used (ex. FMO in exam38),
@@ -961,6 +1210,11 @@ class GAMESS(logfileparser.Logfile):
                         self.homos = [homos]
                 self.homos = numpy.resize(self.homos, [1])
 
+        return line
+
+    def _extract_natom(self, inputfile, line):
+        """Extract the number of atoms."""
+
         # Set the total number of atoms, only once.
         # Normally GAMESS print TOTAL NUMBER OF ATOMS, however in some cases
         #   this is slightly different (ex. lower case for FMO in exam37).
@@ -968,35 +1222,198 @@ class GAMESS(logfileparser.Logfile):
             natom = int(line.split()[-1])
             self.set_attribute('natom', natom)
 
+        return line
+
+    def _extract_nbasis(self, inputfile, line):
+        """Extract the number of basis functions."""
+
         # The first is from Julien's Example and the second is from Alexander's
         # I think it happens if you use a polar basis function instead of a cartesian one
         if line.find("NUMBER OF CARTESIAN GAUSSIAN BASIS") == 1 or line.find("TOTAL NUMBER OF BASIS FUNCTIONS") == 1:
             nbasis = int(line.strip().split()[-1])
             self.set_attribute('nbasis', nbasis)
 
-        elif line.find("TOTAL NUMBER OF CONTAMINANTS DROPPED") >= 0:
+        return line
+
+    def _extract_contaminants(self, inputfile, line):
+        """Reduce nmo by the number of dropped contaminants."""
+
+        if line.find("TOTAL NUMBER OF CONTAMINANTS DROPPED") >= 0:
             nmos_dropped = int(line.split()[-1])
             if hasattr(self, "nmo"):
                 self.set_attribute('nmo', self.nmo - nmos_dropped)
             else:
                 self.set_attribute('nmo', self.nbasis - nmos_dropped)
 
+        return line
+
+    def _extract_spherical(self, inputfile, line):
+        """Extract nmo for spherical harmonic basis sets."""
+
         # Note that this line is present if ISPHER=1, e.g. for C_bigbasis
-        elif line.find("SPHERICAL HARMONICS KEPT IN THE VARIATION SPACE") >= 0:
+        if line.find("SPHERICAL HARMONICS KEPT IN THE VARIATION SPACE") >= 0:
             nmo = int(line.strip().split()[-1])
             self.set_attribute('nmo', nmo)
 
+        return line
+
+    def _extract_nmo(self, inputfile, line):
+        """Extract the number of MOs in the variation space."""
+
         # Note that this line is not always present, so by default
         # NBsUse is set equal to NBasis (see below).
-        elif line.find("TOTAL NUMBER OF MOS IN VARIATION SPACE") == 1:
+        if line.find("TOTAL NUMBER OF MOS IN VARIATION SPACE") == 1:
             nmo = int(line.split()[-1])
             self.set_attribute('nmo', nmo)
 
-        elif line.find("OVERLAP MATRIX") == 0 or line.find("OVERLAP MATRIX") == 1:
+        return line
+
+    def _extract_csfs(self, inputfile, line):
+        """Extract the determinant contributions to the CSFs of a GUGA DRT."""
+
+        # The CSFs are printed when the DRT is generated for a CI or MCSCF run,
+        # as the determinants making up each CSF with their coefficients:
+        #
+        #          DETERMINANT CONTRIBUTION TO CSF'S (BETA IS MINUS)
+        #          -------------------------------------------------
+        # CASE VECTOR =       1
+        # 111144
+        #
+        # FOR MS=S-0
+        # CSF      1: C(  1)= 1.000000 :    9 -9  8 -8
+        # CASE VECTOR =       2
+        # 111234
+        #
+        # FOR MS=S-0
+        # CSF      2: C(  1)=-0.707107 :  -11  9  8 -8
+        #             C(  2)= 0.707107 :   11 -9  8 -8
+        # ...
+        #
+        # Each determinant is given by its occupied active orbitals, with beta
+        # orbitals negative. There can be millions of these lines, so they are
+        # converted to arrays in blocks, and csfoffsets gives the first
+        # determinant of each CSF (and finally the number of determinants).
+        if line[10:43] == "DETERMINANT CONTRIBUTION TO CSF'S":
+
+            self.skip_line(inputfile, 'dashes')
+
+            offsets = utils.GrowableArray("i")
+            coeffs = []
+            dets = []
+            codes = []
+            values = []
+            ndet = 0
+
+            line = next(inputfile)
+            while line[1:12] == "CASE VECTOR":
+                while line.find("C(") < 0:
+                    line = next(inputfile)
+                offsets.append(ndet)
+                while line.find("C(") >= 0:
+                    coefficient, occupations = line.split(":")[-2:]
+                    values.append(coefficient.split("=")[1])
+                    codes.append(occupations)
+                    ndet += 1
+                    line = next(inputfile)
+                if len(values) >= self.csf_block_size:
+                    coeffs.append(numpy.array(values).astype("d"))
+                    dets.append(self._csf_occupations(codes))
+                    codes = []
+                    values = []
+            if values:
+                coeffs.append(numpy.array(values).astype("d"))
+                dets.append(self._csf_occupations(codes))
+            offsets.append(ndet)
+
+            self.csfoffsets = offsets.array
+            self.csfcoeffs = numpy.concatenate(coeffs) if coeffs else numpy.zeros(0, "d")
+            self.csfdets = numpy.concatenate(dets) if dets else numpy.zeros((0, 0), "h")
+
+        return line
+
+    # The number of determinants in the CSF tables decoded at once.
+    csf_block_size = 65536
+
+    @staticmethod
+    def _csf_occupations(codes):
+        """Convert the occupations of a block of CSF determinants to an int16 array.
+
+        Adjacent fields can run together, as in "13-11  9  8", so the numbers are
+        matched with a regular expression rather than split on whitespace.
+        """
+        norb = len(re.findall(r"-?\d+", codes[0]))
+        fields = re.findall(r"-?\d+", " ".join(codes))
+        return numpy.array(fields).astype("h").reshape(-1, norb)
+
+    def _extract_civectors(self, inputfile, line):
+        """Extract the CI vectors printed for each state in CI and MCSCF runs."""
+
+        # Each state is printed with the CSFs whose coefficients are larger
+        # than the print threshold (PRTTOL):
+        #
+        # STATE #    1  ENERGY =     -27.701864041
+        #
+        #      CSF      COEF    OCCUPANCY (IGNORING CORE)
+        #      ---      ----    --------- --------- -----
+        #        1    0.991538  220000
+        #        2    0.006199  210100
+        # ...
+        #
+        # The tables can have hundreds of thousands of rows, so rows with a
+        # coefficient below ci_threshold are dropped as they are read, and
+        # only the rows that are kept are stored. MCSCF runs print the vectors
+        # again after the last iteration, and only the last set is kept.
+        if line[1:8] == "STATE #" and "ENERGY =" in line:
+
+            state = int(line.split()[2])
+
+            self.skip_line(inputfile, 'blank')
+            line = next(inputfile)
+            if line.split()[:3] != ["CSF", "COEF", "OCCUPANCY"]:
+                return line
+            self.skip_line(inputfile, 'dashes')
+
+            if not hasattr(self, "cicoeffs") or state <= len(self.cicoeffs):
+                self.cicsfs = []
+                self.cicoeffs = []
+                self.cioccupancies = []
+
+            threshold = self.ci_threshold
+            csfs = utils.GrowableArray("i")
+            coeffs = utils.GrowableArray("d")
+            occupancies = []
+            norb = 0
+            # The table is not always followed by a blank line.
+            line = next(inputfile)
+            fields = line.split()
+            while len(fields) == 3 and fields[0].isdigit():
+                csf, coeff, occupancy = fields
+                coeff = float(coeff)
+                norb = len(occupancy)
+                if abs(coeff) >= threshold:
+                    csfs.append(int(csf) - 1)
+                    coeffs.append(coeff)
+                    occupancies.append(occupancy)
+                line = next(inputfile)
+                fields = line.split()
+
+            self.cicsfs.append(csfs.array)
+            self.cicoeffs.append(coeffs.array)
+            occupancies = numpy.frombuffer("".join(occupancies).encode(), "u1")
+            self.cioccupancies.append(occupancies.reshape(len(coeffs), norb) - ord("0"))
+
+        return line
+
+    def _extract_aooverlaps(self, inputfile, line):
+        """Extract the atomic orbital overlap matrix."""
+
+        if line.find("OVERLAP MATRIX") == 0 or line.find("OVERLAP MATRIX") == 1:
             # The first is for PC-GAMESS, the second for GAMESS
-            # Read 1-electron overlap matrix
-            if not hasattr(self, "aooverlaps"):
-                self.aooverlaps = numpy.zeros((self.nbasis, self.nbasis), "d")
+            # Read 1-electron overlap matrix, which is printed as its lower triangle in
+            # blocks of five columns, into a buffer with that triangle packed row by row.
+            # The dense aooverlaps is expanded from it by ccData only when it is used.
+            if not hasattr(self, "packedaooverlaps"):
+                self.packedaooverlaps = numpy.zeros(self.nbasis * (self.nbasis + 1) // 2, "d")
             else:
                 self.logger.info("Reading additional aooverlaps...")
             base = 0
@@ -1005,14 +1422,22 @@ class GAMESS(logfileparser.Logfile):
 
                 self.skip_lines(inputfile, ['b', 'basis_fn_number', 'b'])
 
-                for i in range(self.nbasis - base):  # Fewer lines each time
-                    line = next(inputfile)
-                    temp = line.split()
-                    for j in range(4, len(temp)):
-                        self.aooverlaps[base+j-4, i+base] = float(temp[j])
-                        self.aooverlaps[i+base, base+j-4] = float(temp[j])
+                rows = [next(inputfile) for i in range(self.nbasis - base)]  # Fewer lines each time
+                line = rows[-1]
+                block = utils.fixed_width_floats(rows, 11, min(5, self.nbasis - base), start=15)
+
+                # Row i holds the elements (i, j) with base <= j <= i.
+                i = numpy.arange(base, self.nbasis)[:, numpy.newaxis]
+                j = numpy.arange(base, base + block.shape[1])
+                inside = j <= i
+                self.packedaooverlaps[(i * (i + 1) // 2 + j)[inside]] = block[inside]
                 base += 5
 
+        return line
+
+    def _extract_coreelectrons(self, inputfile, line):
+        """Extract core electrons from ECP pseudopotentials."""
+
         # ECP Pseudopotential information
         if "ECP POTENTIALS" in line:
             if not hasattr(self, "coreelectrons"):
@@ -1038,8 +1463,13 @@ class GAMESS(logfileparser.Logfile):
                     line = next(inputfile)
                 header = next(inputfile)
 
+        return line
 
+    def _extract_success(self, inputfile, line):
+        """Check whether the job terminated normally."""
 
         if line[:30] == ' ddikick.x: exited gracefully.'\
                 or line[:40] == ' EXECUTION OF GAMESS TERMINATED NORMALLY':
             self.metadata['success'] = True
+
+        return line
@@ -8,14 +8,22 @@
 
 
 import bz2
+import collections
+import concurrent.futures
 import fileinput
+import functools
 import gzip
 import inspect
 import io
 import logging
+import lzma
+import mmap
 import os
-import random
+import queue
+import re
 import sys
+import threading
+import time
 import zipfile
 from abc import ABC, abstractmethod
 
@@ -26,35 +34,19 @@ from pychamp.parser.data import ccData
 from pychamp.parser.data import ccData_optdone_bool
 
 
-# This seems to avoid a problem with Avogadro.
-logging.logMultiprocessing = 0
+# The zstandard package is optional, and needed only for .zst logfiles.
+_found_zstandard = utils.find_package("zstandard")
+if _found_zstandard:
+    import zstandard
 
+# Extensions of the compressed logfiles that openlogfile can read.
+_decompressors = ('.gz', '.zip', '.bz', '.bz2', '.xz', '.zst')
 
-class myBZ2File(bz2.BZ2File):
-    """Return string instead of bytes"""
-    def __next__(self):
-        line = super(bz2.BZ2File, self).__next__()
-        return line.decode("ascii", "replace")
-
-    def next(self):
-        line = self.__next__()
-        return line
-
-
-class myGzipFile(gzip.GzipFile):
-    """Return string instead of bytes"""
-    def __next__(self):
-        super_ob = super(gzip.GzipFile, self)
-        # seemingly different versions of gzip can have either next or __next__
-        if hasattr(super_ob, 'next'):
-            line = super_ob.next()
-        else:
-            line = super_ob.__next__()
-        return line.decode("ascii", "replace")
+# This seems to avoid a problem with Avogadro.
+logging.logMultiprocessing = 0
 
-    def next(self):
-        line = self.__next__()
-        return line
+# Attributes whose creation is logged by Logfile.__setattr__.
+_logged_attributes = frozenset(ccData._attrlist)
 
 
 class FileWrapper:
@@ -87,9 +79,13 @@ class FileWrapper:
         
         self.last_line = None
 
+        # Number of lines read, for progress reports.
+        self.lines = 0
+
     def next(self):
         line = next(self.src)
         self.pos += len(line)
+        self.lines += 1
         self.last_line = line
         return line
 
@@ -123,12 +119,521 @@ class FileWrapper:
             self.pos = self.size
 
 
-def openlogfile(filename, object=None):
+class MmapFileWrapper:
+    """Iterate over the lines of an uncompressed file through a memory map.
+
+    Positions are byte offsets into the file, so they can be recorded and
+    later passed to seek() to resume reading at the start of any line, and
+    view() gives the raw bytes between two positions without copying them.
+    Reading stops at size, which can be lowered to leave out the end of the file,
+    and exhausted tells whether it has done so since the last seek().
+
+    The file is decoded in chunks of whole lines rather than line by line.
+    Chunks that are plain ASCII without carriage returns, which is almost
+    always the case for logfiles, are read through io.StringIO, so that the
+    offset of a line within its chunk is also its offset in bytes. Positions
+    are only worked out when they are asked for.
+    """
+
+    # Size in bytes of the chunks decoded at once.
+    chunksize = 65536
+
+    def __init__(self, filename, pos=0):
+
+        self.src = io.open(filename, "rb")
+        self.size = os.fstat(self.src.fileno()).st_size
+
+        # Empty files cannot be memory-mapped.
+        if self.size > 0:
+            self.mmap = mmap.mmap(self.src.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.mmap = b""
+
+        self._counted_pos = 0
+        self._counted_lines = 0
+
+        self.seek(pos)
+
+    @property
+    def pos(self):
+        return self._start + self._chunk.tell()
+
+    @property
+    def last_pos(self):
+        return self.pos - len(self._last or "")
+
+    @property
+    def lines(self):
+        """The number of lines before the current position, counted only when asked for."""
+        pos = self.pos
+        if pos >= self._counted_pos:
+            self._counted_lines += self.mmap[self._counted_pos:pos].count(b"\n")
+        else:
+            self._counted_lines -= self.mmap[pos:self._counted_pos].count(b"\n")
+        self._counted_pos = pos
+        return self._counted_lines
+
+    @property
+    def last_line(self):
+        if self._decode and self._last is not None:
+            return self._decoded(self._last)
+        return self._last
+
+    def _fill(self):
+        """Prepare the lines of the next chunk, returning False at the end of the file."""
+
+        self._start = start = self.pos
+        if start >= self.size:
+            self.exhausted = True
+            return False
+        end = self.mmap.rfind(b"\n", start, min(start + self.chunksize, self.size)) + 1
+        if end == 0:
+            end = self.mmap.find(b"\n", start + self.chunksize, self.size) + 1 or self.size
+        chunk = self.mmap[start:end]
+        text = chunk.decode("ascii", "ignore")
+        self._decode = len(text) != len(chunk) or "\r" in text
+        self._chunk = io.BytesIO(chunk) if self._decode else io.StringIO(text)
+        self._nextline = self._chunk.__next__
+        return True
+
+    @staticmethod
+    def _decoded(line):
+        line = line.decode("utf-8", "ignore")
+        if line.endswith("\r\n"):
+            line = line[:-2] + "\n"
+        return line
+
+    def __next__(self):
+        try:
+            line = self._nextline()
+        except StopIteration:
+            if not self._fill():
+                raise
+            line = self._nextline()
+        self._last = line
+        if self._decode:
+            return self._decoded(line)
+        return line
+
+    next = __next__
+
+    def __iter__(self):
+        return self
+
+    def matching_lines(self, pattern):
+        """Iterate over the lines that contain a match of a bytes pattern.
+
+        Lines between the matches are skipped without being decoded, and lines
+        read with next() by the caller in between are not visited again.
+        """
+        while True:
+            pos = self.pos
+            match = pattern.search(self.mmap, pos, self.size)
+            if match is None:
+                return
+            self.seek(self.mmap.rfind(b"\n", pos, match.start()) + 1 or pos)
+            yield self.next()
+
+    def view(self, start, end):
+        """Return the bytes between two positions as a memoryview, without copying.
+
+        The view must be released before the file is closed.
+        """
+        return memoryview(self.mmap)[start:end]
+
+    def close(self):
+        if self.size > 0:
+            self.mmap.close()
+        self.src.close()
+
+    def seek(self, pos, ref=0):
+
+        if ref == 1:
+            pos += self.pos
+        if ref == 2:
+            pos += self.size
+
+        # Start again with an empty chunk, filled at the new position by next().
+        self._start = pos
+        self._chunk = io.StringIO()
+        self._nextline = self._chunk.__next__
+        self._decode = False
+        self._last = None
+
+        # Whether reading has run into size since the last seek.
+        self.exhausted = False
+
+
+class CompressedFileWrapper:
+    """Iterate over the lines of a compressed file, decompressing large blocks at once.
+
+    The opener is called without arguments to open the source, a binary stream
+    with a read method that returns decompressed data, such as the file objects
+    of the gzip, bz2 and lzma modules, members of zip files, or zstandard stream
+    readers. It is called again to rewind the file. Blocks of chunksize bytes are
+    read and decoded at once, and split into lines like in MmapFileWrapper.
+    With threaded=True, the blocks are decompressed in a background thread
+    while the lines of the previous ones are parsed. The position is in bytes
+    of decompressed data, and size is the size of the compressed file.
+    """
+
+    # Size in bytes of the blocks of decompressed data read at once.
+    chunksize = 2**20
+
+    # Number of blocks the background thread can read ahead.
+    readahead = 4
+
+    def __init__(self, opener, size=None, threaded=False, owners=()):
+
+        self.opener = opener
+        self.src = opener()
+        self.size = size
+        self.threaded = threaded
+
+        # Other objects to close with the source, like the archive of a zip member.
+        self.owners = owners
+
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        """Start reading from the current position of the source."""
+
+        self._start = 0
+        self._chunk = io.StringIO()
+        self._nextline = self._chunk.__next__
+        self._decode = False
+        self._last = None
+        self._tail = b""
+        self.lines = 0
+
+        if self.threaded:
+            self._queue = queue.Queue(self.readahead)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._decompress, daemon=True)
+            self._thread.start()
+
+    def _decompress(self):
+        """Read blocks into the queue, in the background thread."""
+
+        try:
+            while not self._stop.is_set():
+                block = self.src.read(self.chunksize)
+                self._put(block)
+                if not block:
+                    return
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _read(self):
+        """Return the next block of decompressed data, empty at the end."""
+
+        if not self.threaded:
+            return self.src.read(self.chunksize)
+        block = self._queue.get()
+        if isinstance(block, Exception):
+            raise block
+        return block
+
+    def _halt(self):
+        """Stop the background thread, if there is one."""
+
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def pos(self):
+        return self._start + self._chunk.tell()
+
+    @property
+    def last_line(self):
+        if self._decode and self._last is not None:
+            return MmapFileWrapper._decoded(self._last)
+        return self._last
+
+    def _fill(self):
+        """Prepare the lines of the next block, returning False at the end of the file."""
+
+        self._start = self.pos
+        data = self._tail
+        while True:
+            block = self._read()
+            if not block:
+                chunk, self._tail = data, b""
+                break
+            data += block
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                chunk, self._tail = data[:cut], data[cut:]
+                break
+        if not chunk:
+            return False
+
+        text = chunk.decode("ascii", "ignore")
+        self._decode = len(text) != len(chunk) or "\r" in text
+        self._chunk = io.BytesIO(chunk) if self._decode else io.StringIO(text)
+        self._nextline = self._chunk.__next__
+        self.lines += chunk.count(b"\n")
+        return True
+
+    def __next__(self):
+        try:
+            line = self._nextline()
+        except StopIteration:
+            if not self._fill():
+                raise
+            line = self._nextline()
+        self._last = line
+        if self._decode:
+            return MmapFileWrapper._decoded(line)
+        return line
+
+    next = __next__
+
+    def __iter__(self):
+        return self
+
+    def close(self):
+        self._halt()
+        self.src.close()
+        for owner in self.owners:
+            owner.close()
+
+    def seek(self, pos, ref=0):
+
+        # Decompressed streams cannot jump around cheaply, but they can start again,
+        # which is done by opening them anew since not all of them can seek.
+        if ref == 1 and pos == 0:
+            return
+        if pos != 0 or ref == 2:
+            raise io.UnsupportedOperation("compressed logfiles can only be rewound")
+        self._halt()
+        self.src.close()
+        self.src = self.opener()
+        self._reset()
+
+
+class ParseTelemetry(collections.namedtuple("ParseTelemetry",
+                                             ["position", "size", "lines", "elapsed", "section"])):
+    """Progress of a parse, as passed to the report() method of progress observers.
+
+    The position and size are in bytes, lines is the number of lines before
+    the position (None if the source does not count them), elapsed is the time
+    since parsing started in seconds, and section is what is being parsed.
+    """
+
+    __slots__ = ()
+
+    @property
+    def megabytes_per_second(self):
+        return self.position / 1e6 / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def lines_per_second(self):
+        if self.lines is None:
+            return None
+        return self.lines / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ProgressTracker:
+    """Report the progress of a parse to an observer at fixed byte intervals.
+
+    The observer needs an initialize(size) method, which is called first, and
+    either a report(telemetry) method taking a ParseTelemetry, or an update(step,
+    text) method, which is called with the position and the current section.
+    An interval attribute on the observer sets the bytes between reports.
+    """
+
+    def __init__(self, observer, inputfile, interval):
+
+        self.observer = observer
+        self.inputfile = inputfile
+        self.interval = getattr(observer, "interval", None) or interval
+        self.section = "Unsupported information"
+        self.start = time.perf_counter()
+        self.next = self.interval
+
+        self.observer.initialize(inputfile.size)
+        self.observer.step = 0
+
+    def follow(self, lines):
+        """Iterate over lines, reporting whenever the next interval is reached."""
+        for line in lines:
+            if self.inputfile.pos >= self.next:
+                self.report()
+            yield line
+
+    def update(self, section):
+        """Set the current section, and report if the next interval is reached."""
+        self.section = section
+        if self.inputfile.pos >= self.next:
+            self.report()
+
+    def report(self, done=False):
+        """Send the current progress to the observer."""
+
+        position = self.inputfile.size if done else self.inputfile.pos
+        section = "Done" if done else self.section
+        if hasattr(self.observer, "report"):
+            telemetry = ParseTelemetry(position, self.inputfile.size,
+                                       getattr(self.inputfile, "lines", None),
+                                       time.perf_counter() - self.start, section)
+            self.observer.report(telemetry)
+        else:
+            self.observer.update(position, section)
+        self.observer.step = position
+        self.next = position + self.interval
+
+
+# A problem found while parsing, see Diagnostics.
+Diagnostic = collections.namedtuple("Diagnostic", ["code", "section", "lineno", "position"])
+
+
+class Diagnostics:
+    """Collect the problems found while parsing a logfile.
+
+    Each problem is recorded as a Diagnostic with one of the codes below, the
+    name of the parser method that found it (section), the line of code in that
+    method, and the byte offset in the logfile of the offending line (position,
+    None if the source does not give one). The records can be queried after
+    parsing. Only the first limit problems with each code in each section are
+    logged, and the number of the others is logged by flush().
+    """
+
+    NOT_BLANK = 0
+    NOT_DASHES = 1
+    NOT_EQUALS = 2
+    NOT_STARS = 3
+
+    messages = (
+        "line not blank as expected",
+        "line not all dashes as expected",
+        "line not all equals as expected",
+        "line not all stars as expected",
+    )
+
+    def __init__(self, logger, limit=5):
+
+        self.logger = logger
+        self.limit = limit
+        self.clear()
+
+    def clear(self):
+        """Forget all problems recorded so far."""
+        self.records = []
+        self.counts = collections.Counter()
+
+    def record(self, code, section, lineno, position, line):
+        """Record a problem found in line, logging it unless the limit is reached."""
+
+        self.records.append(Diagnostic(code, section, lineno, position))
+        key = (code, section)
+        self.counts[key] += 1
+        if self.counts[key] <= self.limit:
+            self.logger.warning("In %s, line %i, %s: %s" % (section, lineno, self.messages[code], line.strip()))
+
+    def query(self, code=None, section=None):
+        """Return the problems recorded with the given code and/or in the given section."""
+        return [record for record in self.records
+                if (code is None or record.code == code) and (section is None or record.section == section)]
+
+    def flush(self):
+        """Log how many problems were recorded but not logged because of the limit."""
+        for (code, section), count in sorted(self.counts.items()):
+            if count > self.limit:
+                self.logger.warning("In %s, %i more times %s" % (section, count - self.limit, self.messages[code]))
+
+
+# The checks done by Logfile.skip_lines, as the Diagnostics code for a failed
+# check and the character that the line should consist of.
+_skip_checks = {
+    'blank': (Diagnostics.NOT_BLANK, ''), 'b': (Diagnostics.NOT_BLANK, ''),
+    'dashes': (Diagnostics.NOT_DASHES, '-'), 'd': (Diagnostics.NOT_DASHES, '-'),
+    'equals': (Diagnostics.NOT_EQUALS, '='), 'e': (Diagnostics.NOT_EQUALS, '='),
+    'stars': (Diagnostics.NOT_STARS, '*'), 's': (Diagnostics.NOT_STARS, '*'),
+}
+
+
+class StopParsing(Exception):
+    """Raised by section handlers when the rest of the logfile is not needed."""
+
+
+class SectionDispatcher:
+    """Keyword index over the section triggers of a parser class.
+
+    All trigger keywords are compiled into a single regular expression, so that
+    a line which does not start any section is rejected with one search. For the
+    few lines that do match, the keywords present are collected in one more scan
+    and only the handlers registered for those keywords are returned.
+    """
+
+    def __init__(self, triggers):
+        """Build the index from (keyword, handler) pairs given in calling order.
+
+        A trigger can also be a (keyword, handler, flags) triple, where flags may
+        be re.IGNORECASE to match the keyword in any case. Such keywords are
+        given in upper case.
+        """
+
+        self.handlers = []
+        nocase = set()
+        for keyword, handler, *flags in triggers:
+            if flags and flags[0] & re.IGNORECASE:
+                nocase.add(keyword)
+            for known, keywords in self.handlers:
+                if known == handler:
+                    keywords.add(keyword)
+                    break
+            else:
+                self.handlers.append((handler, {keyword}))
+
+        # Longer keywords first, so that a keyword is never shadowed by one of
+        # its own prefixes at the same position. Keywords contained in other
+        # keywords are added back explicitly when the longer one is found.
+        keywords = sorted({trigger[0] for trigger in triggers}, key=len, reverse=True)
+        alternatives = "|".join(("(?i:%s)" if keyword in nocase else "%s") % re.escape(keyword)
+                                for keyword in keywords)
+        self._search = re.compile(alternatives).search
+        self.bytes_pattern = re.compile(alternatives.encode())
+        self._finditer = re.compile("(?=(%s))" % alternatives).finditer
+        self._contained = {
+            keyword: {other for other in keywords
+                      if (other in keyword.upper() if other in nocase else other in keyword)}
+            for keyword in keywords
+        }
+        self._nocase = nocase
+
+    def keywords(self, line):
+        """Return the set of trigger keywords found in line, or None if there are none."""
+
+        if self._search(line) is None:
+            return None
+        found = set()
+        for match in self._finditer(line):
+            keyword = match.group(1)
+            if keyword not in self._contained:
+                keyword = keyword.upper()
+            found.update(self._contained[keyword])
+        return found
+
+
+def openlogfile(filename, object=None, threaded=False):
     """Return a file object given a filename or if object specified decompresses it
     if needed and wrap it up.
 
-    Given the filename or file object of a log file or a gzipped, zipped, or bzipped
-    log file, this function returns a file-like object.
+    Given the filename or file object of a log file or a gzipped, zipped, bzipped,
+    xz or zstd compressed log file, this function returns a file-like object.
+    With threaded=True, compressed files are decompressed in a background thread.
 
     Given a list of filenames, this function returns a FileInput object,
     which can be used for seamless iteration without concatenation.
@@ -139,23 +644,42 @@ def openlogfile(filename, object=None):
 
         extension = os.path.splitext(filename)[1]
 
+        # Downloaded contents are given as bytes. Compressed files are opened
+        # by a function, so that they can be opened again to rewind them.
+        def source():
+            return io.BytesIO(object) if object else filename
+        size = len(object) if object else None
+        if size is None and extension in _decompressors:
+            size = os.path.getsize(filename)
+
         if extension == ".gz":
-            fileobject = myGzipFile(filename, "r", fileobj=object)
+            fileobject = CompressedFileWrapper(lambda: gzip.open(source(), "rb"), size, threaded)
 
         elif extension == ".zip":
-            zip = zipfile.ZipFile(object, "r") if object else zipfile.ZipFile(filename, "r")
+            zip = zipfile.ZipFile(source(), "r")
             assert len(zip.namelist()) == 1, "ERROR: Zip file contains more than 1 file"
-            fileobject = io.StringIO(zip.read(zip.namelist()[0]).decode("ascii", "ignore"))
+            member = zip.namelist()[0]
+            fileobject = CompressedFileWrapper(lambda: zip.open(member), size, threaded, owners=(zip,))
 
         elif extension in ['.bz', '.bz2']:
             # Module 'bz2' is not always importable.
             assert bz2 is not None, "ERROR: module bz2 cannot be imported"
-            fileobject = myBZ2File(object, "r") if object else myBZ2File(filename, "r")
+            fileobject = CompressedFileWrapper(lambda: bz2.open(source(), "rb"), size, threaded)
+
+        elif extension == ".xz":
+            fileobject = CompressedFileWrapper(lambda: lzma.open(source(), "rb"), size, threaded)
+
+        elif extension == ".zst":
+            assert _found_zstandard, "ERROR: module zstandard is needed for %s" % filename
+            def opener():
+                compressed = io.BytesIO(object) if object else io.open(filename, "rb")
+                return zstandard.ZstdDecompressor().stream_reader(compressed, closefd=True)
+            fileobject = CompressedFileWrapper(opener, size, threaded)
 
         else:
             # Assuming that object is text file encoded in utf-8
             fileobject = io.StringIO(object.decode('utf-8')) if object \
-                    else FileWrapper(io.open(filename, "r", errors='ignore'))
+                    else MmapFileWrapper(filename)
 
         return fileobject
 
@@ -168,6 +692,36 @@ def openlogfile(filename, object=None):
         return fileinput.input(filename, openhook=fileinput.hook_compressed)
 
 
+def _copy_containers(value, memo):
+    """Copy the plain lists, dictionaries and sets in a value, and GrowableArrays.
+
+    Anything else, including NumPy arrays, is shared. The memo maps the ids of
+    the containers copied so far to their copies, so that containers shared by
+    several attributes stay shared.
+    """
+
+    kind = type(value)
+    if kind not in (list, dict, set, utils.GrowableArray):
+        return value
+    copied = memo.get(id(value))
+    if copied is None:
+        if kind is list:
+            copied = [_copy_containers(item, memo) for item in value]
+        elif kind is dict:
+            copied = {key: _copy_containers(item, memo) for key, item in value.items()}
+        elif kind is set:
+            copied = set(value)
+        else:
+            copied = value.share()
+        memo[id(value)] = copied
+    return copied
+
+
+def _parse_job(parsertype, filename, span, options, kwargs):
+    """Parse one job of a logfile, for Logfile.parse_jobs (possibly in another process)."""
+    return parsertype(filename, span=span, **options).parse(**kwargs)
+
+
 class Logfile(ABC):
     """Abstract class for logfile objects.
 
@@ -175,6 +729,43 @@ class Logfile(ABC):
         GAMESS, GAMESSUK
     """
 
+    # Pairs of (keyword, method name) used by dispatch_sections(), see there, or
+    # triples with re flags as well (see SectionDispatcher).
+    section_triggers = []
+
+    # Sections that parse(lazy=True) decodes only when one of their attributes is
+    # first accessed, as (method names, attributes, last_only) tuples. With
+    # last_only, just the last occurrence of the section in the file is decoded,
+    # which is enough when every occurrence replaces the previous attributes.
+    lazy_sections = []
+
+    # Filled by parse(lazy=True) with the occurrences of deferred sections.
+    deferred_sections = {}
+
+    # The attributes set by each section handler (by method name), and the
+    # attributes a handler needs to have been parsed before it. These are used
+    # by parse(only=..., exclude=...) to skip handlers. Handlers missing from
+    # section_attributes only set metadata or internal state, and always run.
+    section_attributes = {}
+    section_requires = {}
+
+    # Attributes that cannot change any more once they are set, so that parsing
+    # can stop early when only these attributes are requested.
+    final_when_set = ()
+
+    # Filled by parse(only=..., exclude=...) with the handlers to skip.
+    disabled_sections = frozenset()
+
+    # Set by parse(only=...) when parsing can stop as soon as these are all set.
+    stop_after = None
+
+    # Set by parse(progress=...) to report the progress of parsing.
+    progress_tracker = None
+
+    # Regular expression on bytes matching the first line of each job, when
+    # there can be several jobs in one logfile (see split_jobs).
+    job_boundary = None
+
     def __init__(self, source, loglevel=logging.ERROR, logname="Log",
                  logstream=sys.stderr, datatype=ccData_optdone_bool, **kwds):
         """Initialise the Logfile object.
@@ -232,6 +823,9 @@ class Logfile(ABC):
             self.metadata['success'] = False
 
 
+        # Problems found while parsing, which can be queried after parsing.
+        self.diagnostics = Diagnostics(self.logger)
+
         # Periodic table of elements.
         self.table = utils.PeriodicTable()
 
@@ -247,24 +841,56 @@ class Logfile(ABC):
             self.datatype = ccData
         # Parsing of Natural Orbitals and Natural Spin Orbtials into one attribute
         self.unified_no_nso = kwds.get("future",False)
+        # Decode the lazy_sections on demand only (see parse).
+        self.lazy = kwds.get("lazy", False)
+        # Decompress compressed logfiles in a background thread (see openlogfile).
+        self.threaded = kwds.get("threaded", False)
+        # Parse only the bytes from start to end of the logfile, for one of its jobs (see parse_jobs).
+        self.span = kwds.get("span", None)
+        # What is needed to create parsers for the separate jobs in the logfile (see parse_jobs).
+        self.options = dict(kwds, loglevel=loglevel, datatype=datatype)
+        self.options.pop("span", None)
+        # Restrict parsing to some attributes (see parse).
+        self.only = kwds.get("only", None)
+        self.exclude = kwds.get("exclude", None)
 
     def __setattr__(self, name, value):
 
-        # Send info to logger if the attribute is in the list of attributes.
-        if name in ccData._attrlist and hasattr(self, "logger"):
-
-            # Call logger.info() only if the attribute is new.
-            if not hasattr(self, name):
+        # Send info to logger if the attribute is in the list of attributes and is new.
+        # This runs for every assignment while parsing, so the cheap tests come first:
+        # the instance dictionary is the registry of attributes created so far.
+        if name in _logged_attributes and name not in self.__dict__:
+            logger = self.__dict__.get("logger")
+            if logger is not None and logger.isEnabledFor(logging.INFO):
                 if type(value) in [numpy.ndarray, list]:
-                    self.logger.info("Creating attribute %s[]" % name)
+                    logger.info("Creating attribute %s[]" % name)
                 else:
-                    self.logger.info("Creating attribute %s: %s" % (name, str(value)))
+                    logger.info("Creating attribute %s: %s" % (name, str(value)))
 
         # Set the attribute.
         object.__setattr__(self, name, value)
 
-    def parse(self, progress=None, fupdate=0.05, cupdate=0.002):
-        """Parse the logfile, using the assumed extract method of the child."""
+    def parse(self, progress=None, fupdate=0.05, cupdate=0.002, lazy=None,
+              only=None, exclude=None):
+        """Parse the logfile, using the assumed extract method of the child.
+
+        With only and/or exclude (lists of attribute names, defaulting to those
+        passed to the constructor), the section handlers that are not needed
+        for the requested attributes are skipped, and excluded attributes are
+        left out of the returned data. If all requested attributes are listed
+        in final_when_set, reading stops as soon as all of them have been set.
+
+        With lazy=True (the default when lazy=True was passed to the constructor),
+        an uncompressed logfile is memory-mapped and only the lines containing
+        section triggers are visited. The sections listed in lazy_sections are
+        not decoded then; their byte offsets are recorded instead, and they are
+        decoded the first time one of their attributes is accessed on the data.
+
+        With progress, an observer (see ProgressTracker) is told about the
+        progress every time another fupdate fraction of the file has been read.
+        Nothing is done for each line when there is no observer. The cupdate
+        argument is no longer used.
+        """
 
         # Check that the sub-class has an extract attribute,
         #  that is callable with the proper number of arguemnts.
@@ -272,39 +898,60 @@ class Logfile(ABC):
             raise AttributeError("Class %s has no extract() method." % self.__class__.__name__)
         if not callable(self.extract):
             raise AttributeError("Method %s._extract not callable." % self.__class__.__name__)
-        if len(inspect.getargspec(self.extract)[0]) != 3:
+        if len(inspect.getfullargspec(self.extract)[0]) != 3:
             raise AttributeError("Method %s._extract takes wrong number of arguments." % self.__class__.__name__)
 
         # Save the current list of attributes to keep after parsing.
         # The dict of self should be the same after parsing.
         _nodelete = list(set(self.__dict__.keys()))
 
+        # Work out which sections can be skipped.
+        only, exclude = self._configure_sections(only, exclude)
+
+        self.diagnostics.clear()
+
+        # Lazy parsing needs random access, so it is limited to single uncompressed files.
+        if lazy is None:
+            lazy = self.lazy
+        lazy = bool(lazy and self.lazy_sections and self._is_plain_file())
+
         # Initiate the FileInput object for the input files.
         # Remember that self.filename can be a list of files.
-        if not self.isstream:
+        if lazy or self.span:
+            inputfile = self._open_span()
+        elif not self.isstream:
             if not self.isfileinput:
-                inputfile = openlogfile(self.filename)
+                inputfile = openlogfile(self.filename, threaded=self.threaded)
             else:
                 inputfile = self.filename
         else:
             inputfile = FileWrapper(self.stream)
-
-        # Intialize self.progress
-        is_compressed = isinstance(inputfile, myGzipFile) or isinstance(inputfile, myBZ2File)
+        if lazy:
+            self.deferred_sections = {}
+            for names, attributes, last_only in self.lazy_sections:
+                occurrences = []
+                for name in names:
+                    self.deferred_sections[getattr(type(self), name)] = occurrences
+
+        # Intialize the progress reports, which are driven by the position in the file.
+        is_compressed = isinstance(inputfile, CompressedFileWrapper)
         if progress and not (is_compressed):
             self.progress = progress
-            self.progress.initialize(inputfile.size)
-            self.progress.step = 0
-        self.fupdate = fupdate
-        self.cupdate = cupdate
+            interval = int(fupdate * inputfile.size) or 2**20
+            self.progress_tracker = ProgressTracker(progress, inputfile, interval)
 
         # Maybe the sub-class has something to do before parsing.
         self.before_parsing()
 
         # Loop over lines in the file object and call extract().
         # This is where the actual parsing is done.
-        for line in inputfile:
-            self.updateprogress(inputfile, "Unsupported information", cupdate)
+        if lazy:
+            lines = inputfile.matching_lines(self.section_dispatcher().bytes_pattern)
+        else:
+            lines = inputfile
+        if self.progress_tracker is not None:
+            lines = self.progress_tracker.follow(lines)
+        for line in lines:
 
             # This call should check if the line begins a section of extracted data.
             # If it does, it parses some lines and sets the relevant attributes (to self).
@@ -312,6 +959,8 @@ class Logfile(ABC):
             #   in data._attrlist will be moved to final data object that is returned.
             try:
                 self.extract(inputfile, line)
+            except StopParsing:
+                break
             except StopIteration:
                 self.logger.error("Unexpectedly encountered end of logfile.")
                 break
@@ -320,10 +969,267 @@ class Logfile(ABC):
                 self.logger.error("Last line read: %s" % inputfile.last_line)
                 raise
 
+        self.diagnostics.flush()
+
+        # Update the progress as done.
+        if self.progress_tracker is not None:
+            self.progress_tracker.report(done=True)
+
         # Close input file object.
         if not self.isstream:
             inputfile.close()
 
+        data = self._finalize(exclude, lazy)
+
+        # Delete all temporary attributes (including cclib attributes).
+        # All attributes should have been moved to a data object, which will be returned.
+        for attr in list(self.__dict__.keys()):
+            if not attr in _nodelete:
+                self.__delattr__(attr)
+
+        # Perform final checks on values of attributes.
+        data.check_values(logger=self.logger)
+
+        return data
+
+    def follow(self, interval=60.0, timeout=None, only=None, exclude=None):
+        """Parse a logfile that is still being written, yielding partial data.
+
+        The logfile is polled every interval seconds, and the output appended
+        since the previous poll is parsed starting from the parser state left
+        by that poll, so the file is never parsed again from the beginning.
+        After each poll that parsed new output, a data object with the
+        attributes parsed so far is yielded. A section that is still being
+        written when the output runs out is parsed again, from its first line,
+        at the next poll.
+
+        Following stops once the job has terminated normally, when reading can
+        stop early for only (see parse), or when no output was appended for
+        timeout seconds. The last data yielded is then the same as parse() would
+        return for the whole logfile.
+
+        Inputs:
+            interval - seconds to wait between polls
+            timeout - seconds without new output before giving up, or None to wait forever
+            only, exclude - lists of attributes to parse or skip, as in parse
+        """
+
+        if not self._is_plain_file():
+            raise ValueError("Only a single uncompressed logfile can be followed.")
+
+        # Save the current list of attributes to keep after parsing.
+        _nodelete = list(set(self.__dict__.keys()))
+
+        only, exclude = self._configure_sections(only, exclude)
+
+        self.diagnostics.clear()
+        self.before_parsing()
+
+        offset = 0
+        idle = 0.0
+        finished = False
+        stopped = False
+        while not finished:
+            inputfile = MmapFileWrapper(self.filename)
+
+            # The last line is left out until it has been written completely.
+            inputfile.size = inputfile.mmap.rfind(b"\n") + 1
+            start = offset
+            if inputfile.size > offset:
+                state = self._checkpoint()
+                inputfile.seek(offset)
+                try:
+                    cut = self._follow_lines(inputfile)
+                except StopParsing:
+                    cut = None
+                    finished = stopped = True
+                if cut is None:
+                    offset = inputfile.size
+                else:
+                    # Go back to the state at the start of this poll, and parse
+                    # only up to the section that ran out of output this time.
+                    self._restore(state)
+                    inputfile.size = cut
+                    inputfile.seek(offset)
+                    try:
+                        self._follow_lines(inputfile)
+                    except StopParsing:
+                        finished = stopped = True
+                    offset = cut
+            inputfile.close()
+
+            if offset > start:
+                idle = 0.0
+            else:
+                idle += interval
+            if self.metadata.get("success") or (timeout is not None and idle >= timeout):
+                finished = True
+
+            if finished:
+                break
+            if offset > start:
+                yield self._snapshot(exclude)
+            time.sleep(interval)
+
+        # Whatever is left after the last complete section, including a last
+        # line without a newline, is parsed as it would be by parse().
+        if not stopped:
+            inputfile = MmapFileWrapper(self.filename, offset)
+            for line in inputfile:
+                try:
+                    self.extract(inputfile, line)
+                except StopParsing:
+                    break
+                except StopIteration:
+                    self.logger.error("Unexpectedly encountered end of logfile.")
+                    break
+            inputfile.close()
+
+        self.diagnostics.flush()
+        data = self._finalize(exclude)
+
+        # Delete all temporary attributes (including cclib attributes).
+        for attr in list(self.__dict__.keys()):
+            if not attr in _nodelete:
+                self.__delattr__(attr)
+
+        data.check_values(logger=self.logger)
+
+        yield data
+
+    def _follow_lines(self, inputfile):
+        """Call extract() on the lines of inputfile for follow().
+
+        Returns the position of the line that started a section which ran out of
+        lines before it was complete, or None if all lines were parsed.
+        """
+
+        for line in inputfile:
+            start = inputfile.last_pos
+            try:
+                self.extract(inputfile, line)
+            except StopIteration:
+                return start
+            except StopParsing:
+                raise
+            except Exception:
+                self.logger.error("Encountered error when parsing.")
+                self.logger.error("Last line read: %s" % inputfile.last_line)
+                raise
+            # Some sections catch StopIteration themselves, so a section that
+            # ran into the end of the output so far is also treated as cut.
+            if inputfile.exhausted:
+                return start
+        return None
+
+    def _checkpoint(self):
+        """Return the parser state, to go back to it later with _restore().
+
+        Section handlers append to lists and growable arrays, and replace the
+        other attributes they set (the few arrays they change in place are
+        only ever assigned the same values again). So the lists, dictionaries
+        and growable arrays are copied, but arrays are shared, which keeps the
+        checkpoint cheap however much data has been parsed.
+        """
+
+        state = _copy_containers(self.__dict__, {})
+        diagnostics = (len(self.diagnostics.records), collections.Counter(self.diagnostics.counts))
+        return state, diagnostics
+
+    def _restore(self, checkpoint):
+        """Go back to the parser state returned by _checkpoint()."""
+
+        state, (nrecords, counts) = checkpoint
+        self.__dict__.clear()
+        self.__dict__.update(state)
+        del self.diagnostics.records[nrecords:]
+        self.diagnostics.counts = counts
+
+    def _snapshot(self, exclude):
+        """Return the data parsed so far, leaving the parser state untouched."""
+
+        parser = object.__new__(type(self))
+        parser.__dict__.update(self._checkpoint()[0])
+        return parser._finalize(exclude)
+
+    def _open_span(self):
+        """Open the logfile through a memory map, limited to self.span if it is set."""
+
+        if self.span and not self._is_plain_file():
+            raise ValueError("Only a single uncompressed logfile can be parsed in parts.")
+        inputfile = MmapFileWrapper(self.filename)
+        if self.span:
+            start, end = self.span
+            inputfile.size = min(end, inputfile.size)
+            inputfile.seek(start)
+        return inputfile
+
+    def split_jobs(self):
+        """Return the (start, end) byte offsets of the jobs in the logfile.
+
+        Jobs start at lines that match the job_boundary pattern of the parser,
+        which are all found in one scan of the file. Anything before the first
+        of them belongs to the first job.
+        """
+
+        if not self._is_plain_file():
+            raise ValueError("Only a single uncompressed logfile can be split into jobs.")
+
+        inputfile = MmapFileWrapper(self.filename)
+        try:
+            starts = [0]
+            if self.job_boundary is not None:
+                for match in self.job_boundary.finditer(inputfile.mmap):
+                    starts.append(inputfile.mmap.rfind(b"\n", 0, match.start()) + 1)
+            size = inputfile.size
+        finally:
+            inputfile.close()
+
+        # The first job also starts at the beginning of the file.
+        if len(starts) > 1:
+            del starts[1]
+        return list(zip(starts, starts[1:] + [size]))
+
+    def parse_jobs(self, workers=None, **kwargs):
+        """Parse each job of a logfile with several jobs into a separate data object.
+
+        A new parser of the same class and with the same options is used for
+        each job found by split_jobs(), so that nothing is carried over from
+        one job to the next. With workers > 1, the jobs are parsed in a pool of
+        that many processes. The keyword arguments are passed to parse().
+
+        Returns:
+            a list of data objects, one for each job in the order of the logfile
+        """
+
+        spans = self.split_jobs()
+        jobs = [(type(self), self.filename, span, self.options, kwargs) for span in spans]
+        if not workers or workers < 2 or len(jobs) < 2:
+            return [_parse_job(*job) for job in jobs]
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            return list(executor.map(_parse_job, *zip(*jobs)))
+
+    def _configure_sections(self, only, exclude):
+        """Set up the sections to skip for only and exclude (see parse), and return them."""
+
+        if only is None:
+            only = self.only
+        if exclude is None:
+            exclude = self.exclude
+        unknown = set(only or ()).union(exclude or ()).difference(ccData._attrlist)
+        if unknown:
+            raise ValueError("Unknown attributes: %s" % ", ".join(sorted(unknown)))
+        if only is not None or exclude is not None:
+            self.disabled_sections = self._select_sections(only, exclude)
+        if only is not None and set(only).issubset(self.final_when_set):
+            self.stop_after = list(only)
+
+        return only, exclude
+
+    def _finalize(self, exclude, lazy=False):
+        """Complete the parsed attributes and return them in a new data object."""
+
         # Maybe the sub-class has something to do after parsing.
         self.after_parsing()
 
@@ -343,32 +1249,189 @@ class Logfile(ABC):
         if hasattr(self, "incorrect_coreelectrons"):
             self.__delattr__("coreelectrons")
 
+        # Growable buffers are handed over as arrays of the items appended to them.
+        for name, value in list(self.__dict__.items()):
+            if isinstance(value, utils.GrowableArray):
+                self.__dict__[name] = value.array
+
         # Create the data object we want to return. This is normally ccData, but can be changed
         # by passing the datatype argument to the constructor. All supported cclib attributes
         # are copied to this object, but beware that in order to be moved an attribute must be
         # included in the data._attrlist of ccData (or whatever else).
         # There is the possibility of passing assitional argument via self.data_args, but
         # we use this sparingly in cases where we want to limit the API with options, etc.
-        data = self.datatype(attributes=self.__dict__)
+        excluded = set(exclude or ())
+        attributes = self._drop_excluded(self.__dict__, excluded)
+        if lazy:
+            loaders = self._defer_sections(excluded)
+            for loader, names in loaders:
+                for name in names:
+                    attributes.pop(name, None)
+        data = self.datatype(attributes=attributes)
+        if lazy:
+            for loader, names in loaders:
+                data.defer(names, loader)
+        if exclude:
+            data.discard(exclude)
+
+        # The attributes were already converted to arrays and lists of arrays
+        # when they were set on the data object, so that is not repeated here.
 
-        # Now make sure that the cclib attributes in the data object are all the correct type,
-        # including arrays and lists of arrays.
-        data.arrayify()
+        return data
 
-        # Delete all temporary attributes (including cclib attributes).
-        # All attributes should have been moved to a data object, which will be returned.
-        for attr in list(self.__dict__.keys()):
-            if not attr in _nodelete:
-                self.__delattr__(attr)
+    def _drop_excluded(self, attributes, exclude):
+        """Return a copy of a dictionary of attributes without those in exclude.
 
-        # Perform final checks on values of attributes.
-        data.check_values(logger=self.logger)
+        Attributes that the data object would expand from packed ones, like
+        gbasis from basisshells and basisprims, are expanded here instead when
+        only the packed attributes are excluded.
+        """
 
-        # Update self.progress as done.
-        if hasattr(self, "progress"):
-            self.progress.update(inputfile.size, "Done")
+        attributes = dict(attributes)
+        for name, (sources, expand) in self.datatype._packed.items():
+            if name in exclude or name in attributes or exclude.isdisjoint(sources):
+                continue
+            if all(source in attributes for source in sources):
+                attributes[name] = expand(*[attributes[source] for source in sources])
+        return {name: value for name, value in attributes.items() if name not in exclude}
+
+    def _select_sections(self, only, exclude):
+        """Return the section handlers not needed for the requested attributes."""
+
+        wanted = set(only if only is not None else ccData._attrlist)
+        wanted.difference_update(exclude or ())
+
+        # Enable the handlers that set a wanted attribute, and then also those
+        # that set attributes the enabled handlers require, until nothing changes.
+        enabled = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, attributes in self.section_attributes.items():
+                if name not in enabled and wanted.intersection(attributes):
+                    enabled.add(name)
+                    wanted.update(self.section_requires.get(name, ()))
+                    changed = True
+
+        return frozenset(getattr(type(self), name) for name in self.section_attributes
+                         if name not in enabled)
+
+    def _is_plain_file(self):
+        """Whether the source is a single, uncompressed file on disk."""
+        if self.isstream or not isinstance(self.filename, str):
+            return False
+        extension = os.path.splitext(self.filename)[1]
+        return extension not in _decompressors and os.path.isfile(self.filename)
+
+    def _defer_sections(self, exclude):
+        """Prepare loaders for the lazy sections that occurred in the file.
+
+        Returns a list of (loader, names) pairs, where names are the attributes
+        set by the loader. Sections that did not occur at all are not deferred,
+        so the attributes they would set keep any value they got elsewhere.
+        """
 
-        return data
+        state = dict(self.__dict__)
+        loaders = []
+        for names, attributes, last_only in self.lazy_sections:
+            occurrences = self.deferred_sections[getattr(type(self), names[0])]
+            if not occurrences:
+                continue
+            names = tuple(name for name in attributes if name not in exclude)
+            if not names:
+                continue
+            loader = functools.partial(self._decode_sections, state, occurrences, attributes,
+                                       exclude, last_only)
+            loaders.append((loader, names))
+        return loaders
+
+    def _decode_sections(self, state, occurrences, attributes, exclude=frozenset(), last_only=False):
+        """Run deferred section handlers and return the attributes they set.
+
+        The handlers run on a fresh parser object that starts from the state at
+        the end of the lazy parse, in the order the sections occur in the file.
+        Attributes in exclude are left out, as in _drop_excluded.
+        With last_only, only the last occurrence that the handler actually
+        decodes is used, since a line can contain the trigger keyword of a
+        section without being its start.
+        """
+
+        if last_only:
+            for occurrence in reversed(occurrences):
+                decoded = self._decode_sections(state, [occurrence], attributes, exclude)
+                if any(value is not state.get(name) for name, value in decoded.items()):
+                    return decoded
+            return {}
+
+        parser = object.__new__(type(self))
+        parser.__dict__.update(state)
+        parser.deferred_sections = {}
+
+        inputfile = self._open_span()
+        try:
+            for offset, handler in occurrences:
+                # Skip sections already read as part of a previous one.
+                if offset < inputfile.pos:
+                    continue
+                inputfile.seek(offset, 0)
+                handler(parser, inputfile, next(inputfile))
+        except StopIteration:
+            self.logger.error("Unexpectedly encountered end of logfile.")
+        finally:
+            inputfile.close()
+
+        decoded = {name: getattr(parser, name) for name in attributes if hasattr(parser, name)}
+        for name, value in decoded.items():
+            if isinstance(value, utils.GrowableArray):
+                decoded[name] = value.array
+        return self._drop_excluded(decoded, exclude)
+
+    @classmethod
+    def section_dispatcher(cls):
+        """Return the SectionDispatcher for this parser class, building it only once."""
+
+        dispatcher = cls.__dict__.get("_section_dispatcher")
+        if dispatcher is None:
+            triggers = [(keyword, getattr(cls, name), *flags)
+                        for keyword, name, *flags in cls.section_triggers]
+            dispatcher = SectionDispatcher(triggers)
+            cls._section_dispatcher = dispatcher
+        return dispatcher
+
+    def dispatch_sections(self, inputfile, line):
+        """Call the section handlers triggered by a line, for use in extract().
+
+        Subclasses list their handlers in section_triggers. Handlers may read
+        further lines from inputfile; they return the last line they read, and
+        the remaining handlers are then matched against that line, just as if
+        they were consecutive blocks in one long extract() method.
+        """
+
+        dispatcher = self.section_dispatcher()
+        found = dispatcher.keywords(line)
+        if found is None:
+            return
+
+        for handler, keywords in dispatcher.handlers:
+            if found.isdisjoint(keywords):
+                continue
+            if handler in self.disabled_sections:
+                continue
+            if handler in self.deferred_sections:
+                self.deferred_sections[handler].append((inputfile.last_pos, handler))
+                continue
+            if self.progress_tracker is not None:
+                self.progress_tracker.section = handler.__name__.replace("_extract_", "")
+            newline = handler(self, inputfile, line)
+            if self.stop_after and all(attr in self.__dict__ for attr in self.stop_after):
+                raise StopParsing
+            if newline is None:
+                return
+            if newline is not line:
+                line = newline
+                found = dispatcher.keywords(line)
+                if found is None:
+                    return
 
     def before_parsing(self):
         """Set parser-specific variables and do other initial things here."""
@@ -379,13 +1442,14 @@ class Logfile(ABC):
         pass
 
     def updateprogress(self, inputfile, msg, xupdate=0.05):
-        """Update progress."""
+        """Update progress, if requested in parse(), with msg as the current section.
+
+        The progress is only reported when the position in inputfile has moved
+        on by the interval given to parse(), so xupdate is not used any more.
+        """
 
-        if hasattr(self, "progress") and random.random() < xupdate:
-            newstep = inputfile.pos
-            if newstep != self.progress.step:
-                self.progress.update(newstep, msg)
-                self.progress.step = newstep
+        if self.progress_tracker is not None:
+            self.progress_tracker.update(msg)
 
     @abstractmethod
     def normalisesym(self, symlabel):
@@ -394,8 +1458,8 @@ class Logfile(ABC):
     def new_internal_job(self):
         """Delete attributes that can be problematic in multistep jobs.
 
-        TODO: instead of this hack, parse each job in a multistep comptation
-        as a different ccData object (this is for 2.x).
+        Use parse_jobs() to parse each job in a multistep computation as
+        a different ccData object instead.
 
         Some computations are actually sequences of several jobs, and some
         attributes won't work well if parsed across jobs. There include:
@@ -471,7 +1535,7 @@ class Logfile(ABC):
             self.coreelectrons = numpy.zeros(self.natom, 'i')
         self.coreelectrons[indices] = ncore
 
-    def skip_lines(self, inputfile, sequence):
+    def skip_lines(self, inputfile, sequence, depth=1):
         """Read trivial line types and check they are what they are supposed to be.
 
         This function will read len(sequence) lines and do certain checks on them,
@@ -481,13 +1545,10 @@ class Logfile(ABC):
             'dashes' or 'd'     - the line should contain only dashes (or spaces)
             'equals' or 'e'     - the line should contain only equal signs (or spaces)
             'stars' or 's'      - the line should contain only stars (or spaces)
-        """
 
-        expected_characters = {
-            '-': ['dashes', 'd'],
-            '=': ['equals', 'e'],
-            '*': ['stars', 's'],
-        }
+        Lines that fail their check are recorded in the diagnostics with the
+        function and line number of the caller, which is depth frames up.
+        """
 
         lines = []
         for expected in sequence:
@@ -495,31 +1556,21 @@ class Logfile(ABC):
             # Read the line we want to skip.
             line = next(inputfile)
 
-            # Blank lines are perhaps the most common thing we want to check for.
-            if expected in ["blank", "b"]:
-                try:
-                    assert line.strip() == ""
-                except AssertionError:
-                    frame, fname, lno, funcname, funcline, index = inspect.getouterframes(inspect.currentframe())[1]
-                    parser = fname.split('/')[-1]
-                    msg = "In %s, line %i, line not blank as expected: %s" % (parser, lno, line.strip())
-                    self.logger.warning(msg)
-
-            # All cases of heterogeneous lines can be dealt with by the same code.
-            for character, keys in expected_characters.items():
-                if expected in keys:
-                    try:
-                        assert all([c == character for c in line.strip() if c != ' '])
-                    except AssertionError:
-                        frame, fname, lno, funcname, funcline, index = inspect.getouterframes(inspect.currentframe())[1]
-                        parser = fname.split('/')[-1]
-                        msg = "In %s, line %i, line not all %s as expected: %s" % (parser, lno, keys[0], line.strip())
-                        self.logger.warning(msg)
-                        continue
+            # Blank lines are perhaps the most common thing we want to check for,
+            # and all cases of heterogeneous lines can be dealt with by the same code.
+            check = _skip_checks.get(expected)
+            if check is not None:
+                code, character = check
+                if line.strip().strip(character + " ") != "":
+                    caller = sys._getframe(depth)
+                    self.diagnostics.record(code, caller.f_code.co_name, caller.f_lineno,
+                                            getattr(inputfile, "last_pos", None), line)
 
             # Save the skipped line, and we will return the whole list.
             lines.append(line)
 
         return lines
 
-    skip_line = lambda self, inputfile, expected: self.skip_lines(inputfile, [expected])
+    def skip_line(self, inputfile, expected):
+        """Read a single trivial line and check it, like skip_lines."""
+        return self.skip_lines(inputfile, [expected], depth=2)
@@ -74,6 +74,139 @@ def float(number):
     return _BUILTIN_FLOAT(number.replace("D", "E"))
 
 
+def fixed_width_floats(lines, width, ncols, start=0):
+    """Convert a block of fixed-width numerical fields to a 2D array.
+
+    Each line gives one row of the array, read from ncols fields of the given
+    width beginning at the column start. All fields are converted by NumPy in
+    one call, instead of calling float() on each field separately.
+
+    Missing fields at the end of a line, as in rows of a printed triangular
+    matrix, are read as zeros.
+    """
+
+    size = width * ncols
+    padding = ("0".rjust(width)) * ncols
+    block = "".join([field + padding[len(field):]
+                     for field in [line[start:start + size].rstrip() for line in lines]])
+    fields = numpy.frombuffer(block.encode("ascii", "replace"), dtype="S%i" % width)
+    return fields.astype("d").reshape(len(lines), ncols)
+
+
+def unpack_triangle(packed):
+    """Expand the lower triangle of a symmetric matrix, packed row by row,
+    to a square NumPy array.
+    """
+
+    dim = int(round((numpy.sqrt(8 * len(packed) + 1) - 1) / 2))
+    if dim * (dim + 1) // 2 != len(packed):
+        raise ValueError
+
+    rows, cols = numpy.tril_indices(dim)
+    m = numpy.empty((dim, dim), dtype=packed.dtype)
+    m[rows, cols] = packed
+    m[cols, rows] = packed
+
+    return m
+
+
+# Labels of the angular momenta of Gaussian shells.
+shell_labels = "SPDFGHI"
+
+
+def expand_shells(shells, primitives):
+    """Expand a columnar shell table to the nested gbasis lists (PyQuante format).
+
+    Inputs:
+        shells - integer array with a row (atom, angular momentum, primitive
+                 offset, primitive count) for each shell, ordered by atom
+        primitives - array with a row (exponent, coefficient) for each primitive
+    Outputs:
+        gbasis - for each atom a list of (label, [(exponent, coefficient), ...])
+                 tuples, where atoms with the same primitives share one list
+    """
+
+    if not len(shells):
+        return []
+    gbasis = [[] for i in range(int(shells[-1, 0]) + 1)]
+    atomshells = {}
+    # The table is split once where the atom changes, rather than searched for each atom.
+    for rows in numpy.split(shells, numpy.flatnonzero(numpy.diff(shells[:, 0])) + 1):
+        atom = int(rows[0, 0])
+        key = rows[:, 1:].tobytes()
+        if key not in atomshells:
+            atomshells[key] = [(shell_labels[l], [tuple(p) for p in primitives[offset:offset + count].tolist()])
+                               for l, offset, count in rows[:, 1:].tolist()]
+        gbasis[atom] = atomshells[key]
+
+    return gbasis
+
+
+class GrowableArray:
+    """A NumPy array that items can be appended to, along its first axis.
+
+    The items are stored in a preallocated buffer, whose capacity is doubled
+    whenever it is full, so that appending n items copies O(n) data in all.
+    The shape of the items is set by the first one appended.
+    """
+
+    def __init__(self, dtype="d", capacity=8):
+
+        self.dtype = numpy.dtype(dtype)
+        self.capacity = capacity
+        self._buffer = None
+        self._size = 0
+
+    def append(self, item):
+        """Append an item, which must have the same shape as the previous ones."""
+
+        item = numpy.asarray(item, self.dtype)
+        if self._buffer is None:
+            self._buffer = numpy.empty((self.capacity,) + item.shape, self.dtype)
+        elif item.shape != self._buffer.shape[1:]:
+            raise ValueError("cannot append an item of shape %s to items of shape %s"
+                             % (item.shape, self._buffer.shape[1:]))
+        elif self._size == len(self._buffer):
+            buffer = numpy.empty((2 * len(self._buffer),) + item.shape, self.dtype)
+            buffer[:self._size] = self._buffer
+            self._buffer = buffer
+        self._buffer[self._size] = item
+        self._size += 1
+
+    @property
+    def array(self):
+        """The items appended so far, as a view of the buffer."""
+        if self._buffer is None:
+            return numpy.empty((0,), self.dtype)
+        return self._buffer[:self._size]
+
+    def share(self):
+        """Return a GrowableArray with the items appended so far, sharing the buffer.
+
+        Appending to one of the two may overwrite items appended to the other
+        after this call, so only one of them should be appended to.
+        """
+
+        shared = GrowableArray(self.dtype, self.capacity)
+        shared._buffer = self._buffer
+        shared._size = self._size
+        return shared
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.array
+        return self.array.astype(dtype, copy=False)
+
+
 def convertor(value, fromunits, tounits):
     """Convert from one set of units to another.
 
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for the on-disk cache of parsed logfiles"""
+
+import os
+import shutil
+
+import numpy
+
+from pychamp.io import ParseCache
+from pychamp.io import qcread
+from pychamp.parser.gamessparser import GAMESS
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def _entries(cache):
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith(cache.extension))
+
+
+def test_hit_and_invalidation(tmp_path):
+    """A stored entry is used until the logfile changes."""
+
+    logfile = str(tmp_path / "GAMESS01.txt")
+    shutil.copy(os.path.join(__datadir__, "GAMESS01.txt"), logfile)
+    cache = ParseCache(str(tmp_path / "cache"))
+
+    parsed = qcread(logfile, cache=cache)
+    assert len(_entries(cache)) == 1
+    cached = qcread(logfile, cache=cache)
+    assert len(_entries(cache)) == 1
+    numpy.testing.assert_equal(cached.getattributes(), parsed.getattributes())
+    assert isinstance(cached.atomcoords.base, numpy.memmap)
+
+    with open(logfile, "a") as handle:
+        handle.write("\n")
+    qcread(logfile, cache=cache)
+    assert len(_entries(cache)) == 2
+
+
+def test_key(tmp_path):
+    """Options that do not change the result, or only their order, share a key."""
+
+    cache_key = ParseCache(str(tmp_path)).key
+    logfile = os.path.join(__datadir__, "GAMESS01.txt")
+    plain = cache_key(logfile, None, GAMESS)
+    assert cache_key(logfile, {"threaded": True, "workers": 4}, GAMESS) == plain
+    assert cache_key(logfile, {}, None) != plain
+    assert cache_key(logfile, {"only": ["natom", "charge"]}, GAMESS) \
+        == cache_key(logfile, {"only": ("charge", "natom")}, GAMESS)
+    assert cache_key(logfile, {"only": ["natom"]}, GAMESS) != plain
+
+
+def test_eviction(tmp_path):
+    """The least recently used entries are removed once maxsize is exceeded."""
+
+    cache = ParseCache(str(tmp_path / "cache"))
+    first = os.path.join(__datadir__, "GAMESS01.txt")
+    second = os.path.join(__datadir__, "GAMESS02_CAS.txt")
+    qcread(first, cache=cache)
+    size = os.path.getsize(os.path.join(cache.directory, _entries(cache)[0]))
+
+    # Make the first entry clearly the oldest, then allow room for one entry only.
+    path = os.path.join(cache.directory, _entries(cache)[0])
+    os.utime(path, (0, 0))
+    cache.maxsize = size + 1
+    qcread(second, cache=cache)
+    assert len(_entries(cache)) == 1
+    assert not os.path.exists(path)
+
+    cache.clear()
+    assert _entries(cache) == []
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for reading compressed logfiles"""
+
+import bz2
+import gzip
+import lzma
+import os
+import zipfile
+
+import numpy
+import pytest
+
+from pychamp.io import qcread
+from pychamp.parser.logfileparser import CompressedFileWrapper, openlogfile
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+__logfiles__ = ("GAMESS01.txt", "MoOCl4-sp.out", "GAMESS02_CAS.txt")
+
+
+def _compress(contents, path, extension):
+    """Write contents to path in the format of extension, and return the filename."""
+
+    filename = "%s.%s" % (path, extension)
+    if extension == "gz":
+        with gzip.open(filename, "wb") as handle:
+            handle.write(contents)
+    elif extension == "bz2":
+        with bz2.open(filename, "wb") as handle:
+            handle.write(contents)
+    elif extension == "xz":
+        with lzma.open(filename, "wb") as handle:
+            handle.write(contents)
+    elif extension == "zip":
+        with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(os.path.basename(str(path)), contents)
+    elif extension == "zst":
+        zstandard = pytest.importorskip("zstandard")
+        with open(filename, "wb") as handle:
+            handle.write(zstandard.ZstdCompressor().compress(contents))
+    return filename
+
+
+@pytest.mark.parametrize("extension", ["gz", "bz2", "xz", "zip", "zst"])
+@pytest.mark.parametrize("threaded", [False, True])
+def test_compressed_equals_plain(tmp_path, monkeypatch, extension, threaded):
+    """A compressed logfile is parsed to the same data as the plain one."""
+
+    # Small blocks, so that lines and sections straddle block boundaries.
+    monkeypatch.setattr(CompressedFileWrapper, "chunksize", 5000)
+    for name in __logfiles__:
+        logfile = os.path.join(__datadir__, name)
+        with open(logfile, "rb") as handle:
+            compressed = _compress(handle.read(), tmp_path / name, extension)
+        plain = qcread(logfile).getattributes()
+        attributes = qcread(compressed, threaded=threaded).getattributes()
+        assert set(attributes) == set(plain)
+        for attr, value in attributes.items():
+            if attr != "metadata":
+                numpy.testing.assert_equal(value, plain[attr])
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_rewind(tmp_path, monkeypatch, threaded):
+    """Seeking back to the start reads the same lines again."""
+
+    monkeypatch.setattr(CompressedFileWrapper, "chunksize", 5000)
+    logfile = os.path.join(__datadir__, "GAMESS01.txt")
+    with open(logfile, "rb") as handle:
+        compressed = _compress(handle.read(), tmp_path / "GAMESS01.txt", "gz")
+    with open(logfile) as handle:
+        expected = handle.readlines()
+
+    inputfile = openlogfile(compressed, threaded=threaded)
+    head = [next(inputfile) for i in range(100)]
+    inputfile.seek(0)
+    assert list(inputfile) == expected
+    assert head == expected[:100]
+    inputfile.close()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for reading the orbitals in GAMESS punch (.dat) files"""
+
+import numpy
+import pytest
+
+from pychamp.io import qcread
+from pychamp.io.datreader import DAT
+
+
+def _vec(*blocks):
+    """Punch the orbitals of the given coefficient arrays as a $VEC group."""
+
+    lines = [" $VEC"]
+    for coeffs in blocks:
+        for i, orbital in enumerate(coeffs):
+            for j in range(0, len(orbital), 5):
+                values = "".join("%15.8E" % value for value in orbital[j:j + 5])
+                lines.append("%2i%3i%s" % ((i + 1) % 100, j // 5 + 1, values))
+    lines.append(" $END")
+    return lines
+
+
+def _write(tmp_path, lines):
+    filename = tmp_path / "orbitals.dat"
+    filename.write_text("\n".join(lines) + "\n")
+    return str(filename)
+
+
+# Basis functions, alpha and beta orbitals; the orbital number wraps around past 99,
+# and with more orbitals than basis functions the beta ones start halfway.
+@pytest.mark.parametrize("nbasis, nalpha, nbeta", [(12, 12, 0), (40, 3, 0), (130, 120, 0),
+                                                   (40, 3, 2), (130, 101, 101), (30, 200, 200)])
+def test_vec(tmp_path, nbasis, nalpha, nbeta):
+    rng = numpy.random.default_rng(nbasis + nalpha + nbeta)
+    alpha = rng.standard_normal((nalpha, nbasis))
+    beta = rng.standard_normal((nbeta, nbasis))
+    lines = ["--- CLOSED SHELL ORBITALS --- GENERATED AT 10:12:41 LT  6-JUN-2019",
+             "E(RHF)=      -75.0101, E(NUC)=    9.1681, 11 ITERS"]
+    lines += _vec(alpha, beta) if nbeta else _vec(alpha)
+
+    data = qcread(_write(tmp_path, lines))
+    assert isinstance(data.mocoeffs, list)
+    assert len(data.mocoeffs) == (2 if nbeta else 1)
+    assert (data.nbasis, data.nmo) == (nbasis, nalpha)
+    numpy.testing.assert_allclose(data.mocoeffs[0], alpha, rtol=1e-7)
+    if nbeta:
+        numpy.testing.assert_allclose(data.mocoeffs[1], beta, rtol=1e-7)
+
+
+def test_natural_orbitals(tmp_path):
+    """Natural orbitals and occupations are kept apart, and only the last $VEC is used."""
+
+    rng = numpy.random.default_rng(0)
+    first, last, naturals = rng.standard_normal((3, 7, 7))
+    lines = ["--- CLOSED SHELL ORBITALS --- GENERATED AT", "E(RHF)=  -1.0"] + _vec(first[:5]) + \
+            ["--- OPEN SHELL ORBITALS --- GENERATED AT", "E(UHF)= -1.0"] + _vec(last, last[::-1]) + \
+            ["--- NATURAL ORBITALS OF MCSCF --- GENERATED AT"] + _vec(naturals) + \
+            [" $OCC", "  2.0 1.9 0.1", "  0.0", " $END"]
+
+    data = qcread(_write(tmp_path, lines))
+    assert len(data.mocoeffs) == 2
+    numpy.testing.assert_allclose(data.mocoeffs[0], last, rtol=1e-7)
+    numpy.testing.assert_allclose(data.mocoeffs[1], last[::-1], rtol=1e-7)
+    numpy.testing.assert_allclose(data.nocoeffs, naturals, rtol=1e-7)
+    numpy.testing.assert_equal(data.nooccnos, [2.0, 1.9, 0.1, 0.0])
+
+
+def test_incomplete_orbital(tmp_path):
+    lines = _vec(numpy.ones((3, 12)))
+    del lines[-2]
+    with pytest.raises(ValueError):
+        DAT(_write(tmp_path, lines)).parse()
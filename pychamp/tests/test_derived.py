@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for the derived properties of ccData"""
+
+import logging
+import os
+
+from pychamp.io import qcread
+from pychamp.method.electrons import Electrons
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def test_cached_until_source_changes():
+    data = qcread(os.path.join(__datadir__, "GAMESS01.txt"))
+    nelectrons = data.nelectrons
+    alpha = data.number_alpha
+    closed_shell = data.closed_shell
+    assert {"nelectrons", "number_alpha", "closed_shell"} <= set(data._derived)
+
+    # Setting an attribute that none of them is derived from keeps them.
+    data.scfenergies = data.scfenergies
+    assert {"nelectrons", "number_alpha", "closed_shell"} <= set(data._derived)
+
+    # Setting a source drops only the properties derived from it.
+    data.charge = data.charge + 1
+    assert "nelectrons" not in data._derived and "number_alpha" not in data._derived
+    assert "closed_shell" in data._derived
+    assert data.nelectrons == nelectrons - 1
+    assert data.number_alpha == alpha
+    assert data.closed_shell == closed_shell
+
+    del data.charge
+    assert "nelectrons" not in data._derived
+
+
+def test_one_handler():
+    """Method objects share one logger with a single handler."""
+
+    data = qcread(os.path.join(__datadir__, "GAMESS01.txt"))
+    for charge in range(5):
+        data.charge = charge
+        data.nelectrons
+        Electrons(data)
+    logger = logging.getLogger("Log Electrons")
+    assert len(logger.handlers) == 1
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for the keyword dispatch of GAMESS sections"""
+
+import os
+
+from pychamp.io import qcread
+from pychamp.parser.gamessparser import GAMESS
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def test_keywords_in_any_case():
+    """The natom trigger matches the lower case lines of FMO jobs."""
+
+    dispatcher = GAMESS.section_dispatcher()
+    for line in (" TOTAL NUMBER OF ATOMS  =    8", " number of atoms = 8", " Number of Atoms = 8"):
+        assert dispatcher.keywords(line) == {"NUMBER OF ATOMS"}
+    assert dispatcher.keywords(" EIGENVECTORS") == {"EIGENVECTORS"}
+    assert dispatcher.keywords(" eigenvectors") is None
+
+
+def test_natom_in_lower_case(tmp_path):
+    """natom is parsed whatever the case of its line, as for the FMO example exam37."""
+
+    with open(os.path.join(__datadir__, "GAMESS01.txt")) as handle:
+        contents = handle.read()
+    logfile = tmp_path / "GAMESS01.txt"
+    logfile.write_text(contents.replace(" TOTAL NUMBER OF ATOMS ", " Total Number of Atoms "))
+
+    assert qcread(str(logfile)).natom == 8
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for following a logfile that is still being written"""
+
+import copy
+import os
+import threading
+import time
+
+import numpy
+
+from pychamp.io import qcread
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def test_follow_growing_file(tmp_path):
+    """The last data yielded equals parse(), and earlier snapshots do not change."""
+
+    source = os.path.join(__datadir__, "MoOCl4-sp.out")
+    with open(source, "rb") as handle:
+        contents = handle.read()
+    logfile = str(tmp_path / "MoOCl4-sp.out")
+    with open(logfile, "wb") as handle:
+        handle.write(contents[:3000])
+
+    def writer():
+        # Odd block sizes, so that sections are cut in the middle of lines.
+        for start in range(3000, len(contents), 7777):
+            time.sleep(0.002)
+            with open(logfile, "ab") as handle:
+                handle.write(contents[start:start + 7777])
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    snapshots = []
+    for data in qcread(logfile, follow=True, interval=0.003, timeout=0.5):
+        attributes = data.getattributes()
+        snapshots.append((attributes, copy.deepcopy(attributes)))
+    thread.join()
+
+    assert len(snapshots) > 1
+    for attributes, frozen in snapshots:
+        numpy.testing.assert_equal(attributes, frozen)
+
+    expected = qcread(source).getattributes()
+    final = snapshots[-1][0]
+    assert set(final) == set(expected)
+    for name, value in expected.items():
+        numpy.testing.assert_equal(final[name], value)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for campaign archives of many data objects in one HDF5 file"""
+
+import os
+
+import numpy
+import pytest
+
+from pychamp.io import qcread
+from pychamp.io.hdf5io import CampaignArchive
+from pychamp.parser.data import ccData
+
+
+pytest.importorskip("h5py")
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def test_round_trip(tmp_path):
+    """Calculations are read back as they were added, with their columns."""
+
+    path = str(tmp_path / "campaign.h5")
+    parsed = {name: qcread(os.path.join(__datadir__, name))
+              for name in ("GAMESS01.txt", "MoOCl4-sp.out", "GAMESS02_CAS.txt")}
+    extra = ccData({"natom": 2, "atomnos": [1, 1], "atomcharges": {"mulliken": [0.1, -0.1]},
+                    "etsecs": [[[(0, 0), (1, 0), 0.9]]]})
+    with CampaignArchive(path, "w") as archive:
+        for name, data in parsed.items():
+            archive.add(data, name=name)
+        archive.add(extra)
+
+    with CampaignArchive(path) as archive:
+        assert archive.names == list(parsed) + ["00000003"]
+        numpy.testing.assert_equal(archive.column("natom"), [d.natom for d in parsed.values()] + [2])
+
+        # The overlap matrix and basis are only stored in their packed forms.
+        members = set(archive.file["calculations/MoOCl4-sp.out"])
+        assert "packedaooverlaps" in members and "aooverlaps" not in members
+        assert "basisshells" in members and "gbasis" not in members
+
+        for name, data in parsed.items():
+            expected = data.getattributes()
+            attributes = archive[name].getattributes()
+            assert set(attributes) == set(expected)
+            for attr, value in expected.items():
+                numpy.testing.assert_equal(attributes[attr], value)
+
+        loaded = archive["00000003"]
+        numpy.testing.assert_equal(loaded.atomcharges["mulliken"], [0.1, -0.1])
+        assert loaded.etsecs == [[[(0, 0), (1, 0), 0.9]]]
+
+    with CampaignArchive(path, "a") as archive:
+        with pytest.raises(ValueError):
+            archive.add(extra, name="00000003")
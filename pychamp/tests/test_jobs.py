@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for logfiles with several jobs, parsed with split_jobs=True"""
+
+import os
+
+import numpy
+import pytest
+
+from pychamp.io import ccopen, qcread
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+__logfiles__ = ("GAMESS01.txt", "GAMESS02_CAS.txt")
+
+
+def _concatenate(tmp_path):
+    """Write the logfiles one after the other into one file, and return its name."""
+
+    filename = str(tmp_path / "jobs.log")
+    with open(filename, "wb") as output:
+        for name in __logfiles__:
+            with open(os.path.join(__datadir__, name), "rb") as handle:
+                output.write(handle.read())
+    return filename
+
+
+def test_split_jobs(tmp_path):
+    """The jobs cover the file, and the second starts in the header of the second logfile."""
+
+    filename = _concatenate(tmp_path)
+    size = os.path.getsize(os.path.join(__datadir__, __logfiles__[0]))
+    (start, middle), (boundary, end) = ccopen(filename).split_jobs()
+    assert (start, end) == (0, os.path.getsize(filename))
+    assert middle == boundary
+    assert size <= boundary < size + 2000
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_jobs_equal_separate(tmp_path, workers):
+    """Each job is parsed to the same data as its logfile on its own."""
+
+    jobs = qcread(_concatenate(tmp_path), split_jobs=True, workers=workers)
+    assert len(jobs) == len(__logfiles__)
+    for name, job in zip(__logfiles__, jobs):
+        separate = qcread(os.path.join(__datadir__, name)).getattributes()
+        attributes = job.getattributes()
+        assert set(attributes) == set(separate)
+        for attr, value in attributes.items():
+            if attr != "metadata":
+                numpy.testing.assert_equal(value, separate[attr])
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for parsing with lazy=True"""
+
+import os
+
+import numpy
+
+from pychamp.io import qcread
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def test_lazy_equals_eager():
+    """Deferred attributes are decoded to the same values as parse() gives."""
+
+    for name in ("GAMESS01.txt", "MoOCl4-sp.out", "GAMESS02_CAS.txt"):
+        logfile = os.path.join(__datadir__, name)
+        eager = qcread(logfile, lazy=False).getattributes()
+        lazy = qcread(logfile, lazy=True)
+        assert "mocoeffs" in lazy._deferred and "mocoeffs" not in lazy._present
+        attributes = lazy.getattributes()
+        assert set(attributes) == set(eager)
+        for attr, value in eager.items():
+            numpy.testing.assert_equal(attributes[attr], value)
+
+
+def test_last_only_ignores_keyword_without_section(tmp_path):
+    """A line with a section keyword after the last section must not hide it."""
+
+    with open(os.path.join(__datadir__, "GAMESS01.txt")) as handle:
+        lines = handle.readlines()
+    start = next(i for i, line in enumerate(lines) if "EIGENVECTORS" in line)
+    end = next(i for i in range(start, len(lines)) if "END OF RHF CALCULATION" in lines[i])
+    lines.insert(end, " NUMBER OF OCCUPIED MOLECULAR ORBITALS = 13\n")
+    logfile = tmp_path / "GAMESS01.txt"
+    logfile.write_text("".join(lines))
+
+    eager = qcread(str(logfile), lazy=False)
+    lazy = qcread(str(logfile), lazy=True)
+
+    assert "mocoeffs" in lazy._deferred
+    numpy.testing.assert_array_equal(lazy.mocoeffs[0], eager.mocoeffs[0])
+    numpy.testing.assert_array_equal(lazy.moenergies[0], eager.moenergies[0])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for reading many logfiles with qcread_many"""
+
+import os
+
+import numpy
+import pytest
+
+from pychamp.io import qcread, qcread_many
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def _sources(tmp_path):
+    """Logfiles on disk, twice over, with a missing and a broken one in between."""
+
+    with open(os.path.join(__datadir__, "GAMESS01.txt")) as handle:
+        lines = handle.readlines()
+    index = next(i for i, line in enumerate(lines) if "COORDINATES (BOHR)" in line)
+    lines[index + 2] = " N           7.0    not a number\n"
+    broken = tmp_path / "broken.log"
+    broken.write_text("".join(lines))
+
+    logfiles = [os.path.join(__datadir__, name) for name in ("GAMESS01.txt", "MoOCl4-sp.out", "GAMESS02_CAS.txt")]
+    return logfiles + [str(tmp_path / "missing.log"), str(broken)] + logfiles
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_results(tmp_path, ordered):
+    """Every source is delivered once, and a broken one only fails itself."""
+
+    sources = _sources(tmp_path)
+    eager = {source: qcread(source).getattributes() for source in sources[:3]}
+    results = list(qcread_many(sources, workers=2, ordered=ordered, pending=3))
+    if ordered:
+        assert [result.source for result in results] == sources
+    else:
+        assert sorted(result.source for result in results) == sorted(sources)
+    for result in results:
+        if result.source in eager:
+            assert result.error is None
+            attributes = result.data.getattributes()
+            assert set(attributes) == set(eager[result.source])
+            for attr, value in attributes.items():
+                numpy.testing.assert_equal(value, eager[result.source][attr])
+        elif result.source.endswith("broken.log"):
+            assert result.data is None
+            assert isinstance(result.error, ValueError)
+        else:
+            # A missing file is not recognised, so qcread returns None.
+            assert result.data is None and result.error is None
+
+
+def test_pending():
+    with pytest.raises(ValueError):
+        list(qcread_many([], pending=0))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for the CSF and CI vector tables of a GAMESS MCSCF logfile"""
+
+import os
+import re
+
+import numpy
+import pytest
+
+from pychamp.io import qcread
+from pychamp.parser.gamessparser import GAMESS
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+__logfile__ = os.path.join(__datadir__, "GAMESS02_CAS.txt")
+
+
+def _csf_table():
+    """Read the determinants of each CSF line by line, as (coefficient, occupations) lists."""
+
+    csfs = []
+    with open(__logfile__) as handle:
+        lines = iter(handle)
+        for line in lines:
+            if "DETERMINANT CONTRIBUTION TO CSF'S" in line:
+                break
+        for line in lines:
+            if line.startswith(" CSF"):
+                csfs.append([])
+            elif line.startswith(" TOTAL NUMBER OF INTEGRALS"):
+                break
+            if "C(" in line:
+                coefficient, occupations = line.split(":")[-2:]
+                occupations = [int(field) for field in re.findall(r"-?\d+", occupations)]
+                csfs[-1].append((float(coefficient.split("=")[1]), occupations))
+    return csfs
+
+
+def test_csf_first_determinants():
+    data = qcread(__logfile__)
+    assert data.csfdets.dtype == numpy.int16
+    numpy.testing.assert_equal(data.csfoffsets[:4], [0, 1, 3, 4])
+    numpy.testing.assert_equal(data.csfcoeffs[:3], [1.0, -0.707107, 0.707107])
+    numpy.testing.assert_equal(data.csfdets[:4], [[9, -9, 8, -8], [-11, 9, 8, -8], [11, -9, 8, -8], [11, -11, 8, -8]])
+
+
+@pytest.mark.parametrize("block_size", [None, 1, 7])
+def test_csf_arrays(monkeypatch, block_size):
+    """The arrays hold every determinant of every CSF, however many are decoded at once."""
+
+    if block_size is not None:
+        monkeypatch.setattr(GAMESS, "csf_block_size", block_size)
+    data = qcread(__logfile__)
+    csfs = _csf_table()
+
+    assert len(data.csfoffsets) == len(csfs) + 1
+    assert data.csfoffsets[-1] == len(data.csfcoeffs) == len(data.csfdets)
+    for index, determinants in enumerate(csfs):
+        start, end = data.csfoffsets[index], data.csfoffsets[index + 1]
+        numpy.testing.assert_equal(data.csfcoeffs[start:end], [coefficient for coefficient, occupations in determinants])
+        numpy.testing.assert_equal(data.csfdets[start:end], [occupations for coefficient, occupations in determinants])
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_ci_vectors(lazy):
+    """Only the CI vectors printed after the last MCSCF iteration are kept."""
+
+    data = qcread(__logfile__, lazy=lazy)
+    assert len(data.cicoeffs) == len(data.cicsfs) == len(data.cioccupancies) == 1
+    numpy.testing.assert_equal(data.cicsfs[0], [0, 6, 8, 14, 17, 22, 23])
+    numpy.testing.assert_equal(data.cicoeffs[0], [0.983573, -0.059475, -0.051998, 0.051797,
+                                                  0.069403, -0.077194, -0.063666])
+    assert data.cioccupancies[0].shape == (7, 6)
+    numpy.testing.assert_equal(data.cioccupancies[0][:3], [[2, 2, 0, 0, 0, 0], [1, 1, 0, 1, 0, 1], [2, 0, 0, 0, 0, 2]])
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_ci_threshold(lazy):
+    """Rows with a coefficient below ci_threshold are dropped."""
+
+    full = qcread(__logfile__)
+    data = qcread(__logfile__, lazy=lazy, ci_threshold=0.06)
+    kept = numpy.abs(full.cicoeffs[0]) >= 0.06
+    numpy.testing.assert_equal(data.cicsfs[0], [0, 17, 22, 23])
+    numpy.testing.assert_equal(data.cicsfs[0], full.cicsfs[0][kept])
+    numpy.testing.assert_equal(data.cicoeffs[0], full.cicoeffs[0][kept])
+    numpy.testing.assert_equal(data.cioccupancies[0], full.cioccupancies[0][kept])
+
+    data = qcread(__logfile__, lazy=lazy, ci_threshold=1.0)
+    assert data.cicsfs[0].shape == data.cicoeffs[0].shape == (0,)
+    assert data.cioccupancies[0].shape == (0, 6)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for saving data objects to .npz archives and loading them back"""
+
+import os
+import zipfile
+
+import numpy
+
+from pychamp.io import qcread
+from pychamp.parser.data import ccData
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+
+def test_round_trip_stores_packed_attributes_once(tmp_path):
+    """Only the packed overlaps and basis are stored, and memory-mapped on load."""
+
+    data = qcread(os.path.join(__datadir__, "MoOCl4-sp.out"))
+    expected = data.getattributes()
+    path = str(tmp_path / "MoOCl4-sp.npz")
+    data.save(path)
+
+    with zipfile.ZipFile(path) as archive:
+        members = set(archive.namelist())
+    assert "packedaooverlaps.npy" in members
+    assert "basisshells.npy" in members
+    assert "aooverlaps.npy" not in members
+    assert "gbasis.npy" not in members
+
+    for mmap in (True, False):
+        loaded = ccData.load(path, mmap=mmap)
+        assert type(loaded) is type(data)
+        packed = loaded.packedaooverlaps
+        assert isinstance(packed.base if packed.base is not None else packed, numpy.memmap) == mmap
+        attributes = loaded.getattributes()
+        assert set(attributes) == set(expected)
+        for name, value in expected.items():
+            numpy.testing.assert_equal(attributes[name], value)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#
+#
+
+"""Tests for parsing with only=[...] and exclude=[...]"""
+
+import os
+
+import numpy
+import pytest
+
+from pychamp.io import qcread
+
+
+__datadir__ = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+
+__logfiles__ = ("GAMESS01.txt", "MoOCl4-sp.out", "GAMESS02_CAS.txt")
+
+
+@pytest.mark.parametrize("name", __logfiles__)
+@pytest.mark.parametrize("only", [["scfenergies"], ["atomcoords", "mocoeffs"], ["natom", "charge", "mult"]])
+def test_only_equals_eager(name, only):
+    """The requested attributes have the same values as in a full parse."""
+
+    logfile = os.path.join(__datadir__, name)
+    eager = qcread(logfile).getattributes()
+    selected = qcread(logfile, only=only).getattributes()
+    for attr in only:
+        assert (attr in selected) == (attr in eager)
+        if attr in eager:
+            numpy.testing.assert_equal(selected[attr], eager[attr])
+
+
+@pytest.mark.parametrize("name", __logfiles__)
+@pytest.mark.parametrize("lazy", [False, True])
+def test_exclude_equals_eager(name, lazy):
+    """Excluded attributes are left out and the rest are as in a full parse."""
+
+    logfile = os.path.join(__datadir__, name)
+    exclude = ["mocoeffs", "aooverlaps", "gbasis"]
+    eager = qcread(logfile).getattributes()
+    selected = qcread(logfile, lazy=lazy, exclude=exclude).getattributes()
+    assert set(selected) == set(eager).difference(exclude)
+    for attr, value in selected.items():
+        numpy.testing.assert_equal(value, eager[attr])
+
+
+def test_unknown_attribute():
+    with pytest.raises(ValueError):
+        qcread(os.path.join(__datadir__, "GAMESS01.txt"), only=["nosuchattribute"])